@@ -0,0 +1,222 @@
+# benchmarks/bench.py
+"""
+離線基準測試：各站擷取成本，以及 export_to_word_from_urls 的端對端耗時。
+
+用法：
+    python benchmarks/bench.py                        # 結果以 JSON 輸出到 stdout
+    python benchmarks/bench.py -o result.json         # 存檔
+    python benchmarks/bench.py --baseline old.json    # 與先前結果比較（輸出到 stderr）
+    python benchmarks/bench.py --sizes 1,10 --no-browser
+    python benchmarks/bench.py --record https://...   # 把線上頁面存成 fixture
+
+fixtures/ 內是依各站版面結構製作的樣本頁（含導覽列、廣告、推薦文章等雜訊），
+可用 --record 換成實際快照。匯出測試透過 fixture_server 提供頁面，不連外網；
+Playwright 類站台需先 `playwright install chromium`，否則請加 --no-browser。
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fixture_server import FIXTURES_DIR, fixture_url, load_fixture, proxy_url, start_server
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 3)
+
+
+def bench_sites(repeat: int) -> dict:
+    """各站：解析時間、峰值記憶體、段落數、輸出 checksum"""
+    from modules.fetch_content import extract
+    from modules.sites import SITES
+
+    results = {}
+    for spec in SITES:
+        raw = load_fixture(spec.key)
+        if raw is None:
+            continue
+        html = raw.decode("utf-8")
+
+        extract(spec, html)  # 暖機（strainer 建立、regex 編譯）
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            title, lead, paragraphs = extract(spec, html)
+            timings.append(time.perf_counter() - started)
+
+        tracemalloc.start()
+        extract(spec, html)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        text = "\n".join(([title] if lead is None else [title, lead]) + paragraphs)
+        results[spec.key] = {
+            "fetch": spec.fetch,
+            "html_bytes": len(raw),
+            "parse_ms_median": _ms(statistics.median(timings)),
+            "parse_ms_min": _ms(min(timings)),
+            "peak_kib": round(peak / 1024, 1),
+            "paragraphs": len(paragraphs),
+            "chars": len(text),
+            "sha256": hashlib.sha256(text.encode("utf-8")).hexdigest(),
+        }
+    return results
+
+
+async def bench_export(sizes, include_browser: bool) -> dict:
+    """端對端：N 則新聞從抓取到產生 .docx"""
+    from modules.content_cache import CONTENT_CACHE
+    from modules.export_word import export_to_word_from_urls
+    from modules.sites import SITES
+
+    keys = [spec.key for spec in SITES
+            if load_fixture(spec.key) is not None and (include_browser or spec.fetch == "http")]
+    results = {}
+    for n in sizes:
+        urls = [fixture_url(keys[i % len(keys)], i) for i in range(n)]
+        CONTENT_CACHE.clear()
+
+        tracemalloc.start()
+        started = time.perf_counter()
+        _, document = await export_to_word_from_urls(urls)
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        results[str(n)] = {
+            "articles": n,
+            "seconds": round(elapsed, 4),
+            "ms_per_article": _ms(elapsed / n),
+            "peak_kib": round(peak / 1024, 1),
+            "docx_bytes": len(document.getbuffer()),
+        }
+    return results
+
+
+def _delta(new, old):
+    return (new - old) / old * 100 if old else 0.0
+
+
+def compare(current: dict, baseline: dict) -> str:
+    """輸出與基準結果的差異（文字表格）"""
+    lines = ["site          parse ms (old → new)        peak KiB     output"]
+    for key, cur in current.get("sites", {}).items():
+        old = baseline.get("sites", {}).get(key)
+        if not old:
+            continue
+        changed = "same" if cur["sha256"] == old["sha256"] else "CHANGED"
+        lines.append(
+            f"{key:12s}  {old['parse_ms_median']:8.2f} → {cur['parse_ms_median']:8.2f} "
+            f"({_delta(cur['parse_ms_median'], old['parse_ms_median']):+6.1f}%)  "
+            f"{cur['peak_kib']:8.1f}     {changed}"
+        )
+    for n, cur in current.get("export", {}).items():
+        old = baseline.get("export", {}).get(n)
+        if not old:
+            continue
+        lines.append(
+            f"export N={n:<4s} {old['seconds']:8.3f} → {cur['seconds']:8.3f} s "
+            f"({_delta(cur['seconds'], old['seconds']):+6.1f}%)  peak {cur['peak_kib']:.1f} KiB"
+        )
+    return "\n".join(lines)
+
+
+async def record(urls):
+    """抓取線上頁面（瀏覽器類站台會渲染）並存成 fixtures/<key>.html"""
+    from modules.browser_manager import BrowserManager
+    from modules.fetch_content import render_site
+    from modules.http_client import close_client, fetch_html
+    from modules.sites import find_site
+
+    try:
+        for url in urls:
+            spec = find_site(url)
+            if spec is None:
+                print(f"略過（不支援的來源）：{url}", file=sys.stderr)
+                continue
+            if spec.fetch == "browser":
+                html = await render_site(url, spec)
+            else:
+                html = await fetch_html(url, headers=spec.headers)
+            path = os.path.join(FIXTURES_DIR, f"{spec.key}.html")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(html)
+            print(f"已儲存 {path}（{len(html)} 字元）", file=sys.stderr)
+    finally:
+        await close_client()
+        await BrowserManager.shutdown()
+
+
+async def run(args) -> dict:
+    from modules.browser_manager import BrowserManager
+    from modules.http_client import close_client
+
+    result = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "repeat": args.repeat,
+        },
+        "sites": bench_sites(args.repeat),
+    }
+    try:
+        from modules.parsing import PARSER
+        import bs4
+        result["meta"].update(parser=PARSER, bs4=bs4.__version__)
+        if args.sizes:
+            result["export"] = await bench_export(args.sizes, not args.no_browser)
+    finally:
+        await close_client()
+        await BrowserManager.shutdown()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="news-export-bot 離線基準測試")
+    parser.add_argument("-o", "--output", help="結果 JSON 存檔路徑（預設輸出到 stdout）")
+    parser.add_argument("--baseline", help="與先前的結果 JSON 比較")
+    parser.add_argument("--repeat", type=int, default=20, help="每站解析次數（預設 20）")
+    parser.add_argument("--sizes", default="1,10,100", help="匯出測試的新聞則數，逗號分隔；空字串略過")
+    parser.add_argument("--no-browser", action="store_true", help="匯出測試略過需 Playwright 的站台")
+    parser.add_argument("--record", nargs="+", metavar="URL", help="把線上頁面存成 fixture 後結束")
+    args = parser.parse_args()
+    args.sizes = [int(n) for n in args.sizes.split(",") if n.strip()]
+
+    os.chdir(ROOT)  # 範本以相對路徑開啟
+
+    if args.record:
+        asyncio.run(record(args.record))
+        return
+
+    # ✅ 所有對外請求導向本機 fixture 伺服器（需在載入 modules 之前設定）
+    server = start_server()
+    os.environ["HTTP_PROXY"] = os.environ["BROWSER_PROXY"] = proxy_url(server)
+
+    try:
+        result = asyncio.run(run(args))
+    finally:
+        server.shutdown()
+
+    output = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            print(compare(result, json.load(f)), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
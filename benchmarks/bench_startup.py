@@ -0,0 +1,218 @@
+# benchmarks/bench_startup.py
+"""
+冷啟動基準測試：export_bot 的 import 時間、開始監聽的時間、第一次回覆的時間。
+
+用法：
+    python benchmarks/bench_startup.py                   # 結果以 JSON 輸出到 stdout
+    python benchmarks/bench_startup.py -o result.json     # 存檔
+    python benchmarks/bench_startup.py --baseline old.json
+    python benchmarks/bench_startup.py --prewarm ""       # 停用背景預熱
+
+每一輪都啟動新的 Python 程序（不受前一輪已載入模組影響）。
+time-to-first-response 以本機假的 Telegram Bot API 量測：啟動 export_bot.py，
+等 /metrics 可連線後送入一則「清單」更新，直到假 API 收到 sendMessage 為止。
+"""
+import argparse
+import json
+import os
+import platform
+import signal
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOKEN = "123456:bench"
+
+# 啟動時不應載入的重量級模組（出現代表延遲載入失效）
+HEAVY_MODULES = ("playwright", "docx", "bs4", "lxml", "modules.fetch_content", "modules.export_word")
+
+IMPORT_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+import export_bot
+elapsed = time.perf_counter() - started
+print(json.dumps({"seconds": elapsed, "heavy": [m for m in %r if m in sys.modules]}))
+""" % (HEAVY_MODULES,)
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 3)
+
+
+class FakeBotAPI(BaseHTTPRequestHandler):
+    """只回應 export_bot 會用到的 Bot API 方法；記錄第一次 sendMessage 的時間"""
+    protocol_version = "HTTP/1.1"
+    replied = threading.Event()
+    replied_at = 0.0
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        method = self.path.rsplit("/", 1)[-1]
+        if method == "getMe":
+            result = {"id": 1, "is_bot": True, "first_name": "bench", "username": "bench_bot"}
+        elif method == "sendMessage":
+            result = {"message_id": 2, "date": int(time.time()), "chat": {"id": 1, "type": "private"}, "text": ""}
+            if not FakeBotAPI.replied.is_set():
+                FakeBotAPI.replied_at = time.perf_counter()
+                FakeBotAPI.replied.set()
+        else:
+            result = True
+
+        body = json.dumps({"ok": True, "result": result}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _free_port() -> int:
+    import socket
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _bot_env(prewarm: str, **extra) -> dict:
+    env = dict(os.environ)
+    env.update(
+        TELEGRAM_TOKEN=TOKEN, CLOUD_RUN_URL="localhost", PREWARM=prewarm,
+        SESSION_BACKEND="memory", RAW_STORE_PATH="", **extra,
+    )
+    return env
+
+
+def bench_import(runs: int, prewarm: str) -> dict:
+    timings, heavy = [], set()
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", IMPORT_SCRIPT], cwd=ROOT, env=_bot_env(prewarm),
+            capture_output=True, text=True, check=True,
+        )
+        data = json.loads(out.stdout.strip().splitlines()[-1])
+        timings.append(data["seconds"])
+        heavy.update(data["heavy"])
+    return {"import_ms_median": _ms(statistics.median(timings)), "import_ms_min": _ms(min(timings)),
+            "heavy_modules_loaded": sorted(heavy)}
+
+
+def _wait_listening(port: int, deadline: float):
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=1):
+                return time.perf_counter()
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.005)
+    raise TimeoutError("export_bot 未在時限內開始監聽")
+
+
+def _send_update(port: int):
+    update = {
+        "update_id": 1,
+        "message": {
+            "message_id": 1, "date": int(time.time()), "text": "清單",
+            "chat": {"id": 1, "type": "private"},
+            "from": {"id": 1, "is_bot": False, "first_name": "bench"},
+        },
+    }
+    request = urllib.request.Request(
+        f"http://127.0.0.1:{port}/{TOKEN}", data=json.dumps(update).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+    )
+    urllib.request.urlopen(request, timeout=5).close()
+
+
+def bench_first_response(runs: int, prewarm: str, timeout: float = 30) -> dict:
+    api = ThreadingHTTPServer(("127.0.0.1", 0), FakeBotAPI)
+    api.daemon_threads = True
+    threading.Thread(target=api.serve_forever, daemon=True).start()
+    api_url = f"http://127.0.0.1:{api.server_address[1]}/bot"
+
+    listening, first_response = [], []
+    try:
+        for _ in range(runs):
+            FakeBotAPI.replied.clear()
+            port = _free_port()
+            started = time.perf_counter()
+            proc = subprocess.Popen(
+                [sys.executable, "export_bot.py"], cwd=ROOT,
+                env=_bot_env(prewarm, PORT=str(port), TELEGRAM_API_URL=api_url),
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+            try:
+                listening.append(_wait_listening(port, started + timeout) - started)
+                _send_update(port)
+                if not FakeBotAPI.replied.wait(timeout):
+                    raise TimeoutError("export_bot 未在時限內回覆")
+                first_response.append(FakeBotAPI.replied_at - started)
+            finally:
+                proc.send_signal(signal.SIGTERM)
+                try:
+                    proc.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    proc.kill()
+    finally:
+        api.shutdown()
+
+    return {"listening_ms_median": _ms(statistics.median(listening)),
+            "first_response_ms_median": _ms(statistics.median(first_response))}
+
+
+def _delta(new, old):
+    return (new - old) / old * 100 if old else 0.0
+
+
+def compare(current: dict, baseline: dict) -> str:
+    lines = []
+    for key in ("import_ms_median", "listening_ms_median", "first_response_ms_median"):
+        if key in current and key in baseline:
+            lines.append(f"{key:26s} {baseline[key]:9.1f} → {current[key]:9.1f} ms "
+                         f"({_delta(current[key], baseline[key]):+6.1f}%)")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="news-export-bot 冷啟動基準測試")
+    parser.add_argument("-o", "--output", help="結果 JSON 存檔路徑（預設輸出到 stdout）")
+    parser.add_argument("--baseline", help="與先前的結果 JSON 比較")
+    parser.add_argument("--runs", type=int, default=5, help="每項量測的次數（預設 5）")
+    parser.add_argument("--prewarm", default="template", help="傳給 export_bot 的 PREWARM（預設 template）")
+    args = parser.parse_args()
+
+    result = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "runs": args.runs,
+            "prewarm": args.prewarm,
+        },
+    }
+    result.update(bench_import(args.runs, args.prewarm))
+    result.update(bench_first_response(args.runs, args.prewarm))
+
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            print(compare(result, json.load(f)), file=sys.stderr)
+
+    if result["heavy_modules_loaded"]:
+        print(f"警告：啟動時載入了 {', '.join(result['heavy_modules_loaded'])}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
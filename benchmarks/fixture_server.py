@@ -0,0 +1,82 @@
+# benchmarks/fixture_server.py
+"""
+離線基準測試用的本機 HTTP 伺服器。
+
+以 HTTP proxy 的方式運作：httpx（HTTP_PROXY）與 Chromium（BROWSER_PROXY）
+送出的 http:// 請求都會打到這裡，再依網域對應的站台回傳 fixtures/<key>.html。
+"""
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.sites import SITES_BY_KEY, find_site
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def load_fixture(key: str) -> bytes | None:
+    path = os.path.join(FIXTURES_DIR, f"{key}.html")
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        return f.read()
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    fixtures = {}  # key -> bytes（啟動時載入）
+
+    def do_GET(self):
+        # proxy 請求帶完整網址；直接連線時用 Host 標頭
+        url = self.path if self.path.startswith("http") else f"http://{self.headers.get('Host', '')}{self.path}"
+        spec = find_site(url)
+        body = self.fixtures.get(spec.key) if spec else None
+        if body is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # 基準測試時不輸出存取紀錄
+
+
+def start_server(host="127.0.0.1", port=0) -> ThreadingHTTPServer:
+    """於背景執行緒啟動伺服器，回傳 server（server.server_address 為實際位址）"""
+    FixtureHandler.fixtures = {
+        name[:-5]: load_fixture(name[:-5])
+        for name in os.listdir(FIXTURES_DIR) if name.endswith(".html")
+    }
+    server = ThreadingHTTPServer((host, port), FixtureHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def proxy_url(server: ThreadingHTTPServer) -> str:
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}"
+
+
+def fixture_url(key: str, n: int = 0) -> str:
+    """某站台的測試網址（http://，經 proxy 導到本機）"""
+    host = SITES_BY_KEY[key].hosts[0]
+    return f"http://www.{host}/bench/{key}?n={n}"
+
+
+if __name__ == "__main__":
+    srv = start_server(port=int(os.environ.get("PORT", 8765)))
+    print(f"fixture server on {proxy_url(srv)} (Ctrl+C 結束)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        srv.shutdown()
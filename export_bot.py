@@ -1,12 +1,30 @@
+import time
+
+_STARTED = time.perf_counter()  # 啟動計時起點（import 之前）
+
+import asyncio
+import importlib
 import os
 import logging
 import re
+import signal
+import sys
+from contextlib import aclosing
 from dotenv import load_dotenv
-from telegram import Update
+from telegram import MessageEntity, Update
 from telegram.ext import Application, MessageHandler, ContextTypes, filters
 
-from modules.fetch_content import fetch_content
-from modules.export_word import export_to_word
+# fetch_content（bs4、playwright）與 export_word（python-docx）載入較慢，
+# 第一次使用或背景預熱時才載入，讓 webhook 盡快開始接收
+from modules.article import NO_TITLE
+from modules.export_progress import ProgressMessage
+from modules.export_jobs import ExportScheduler, ExportQueueFull
+from modules.session_store import SessionStore, create_backend
+from modules.clipping_list import ClippingList, dedup_key, simhash
+from modules.cpu_pool import run_cpu
+from modules.sites import find_site
+from modules.metrics import Counter, Gauge, Histogram
+from modules.webhook_server import build_web_app
 
 # ✅ 設定 logging
 logging.basicConfig(
@@ -16,52 +34,150 @@ logging.basicConfig(
 logging.getLogger("httpx").setLevel(logging.WARNING)
 logger = logging.getLogger("news-export-bot")
 
+# ✅ 啟動後在背景預熱的項目（逗號分隔；空字串停用）：template（Word 範本）、browser（Chromium）
+PREWARM = {item.strip() for item in os.environ.get("PREWARM", "template,browser").split(",") if item.strip()}
+
+PENDING_TITLE = "（標題抓取中…）"
+
+# ✅ 匯出排程：全域同時執行上限、每位使用者一次一個
+export_scheduler = ExportScheduler(
+    max_workers=int(os.environ.get("EXPORT_WORKERS", 2)),
+    max_queue=int(os.environ.get("EXPORT_QUEUE_LIMIT", 20)),
+)
+
+# ✅ 指標：訊息處理耗時、匯出排隊與結果
+HANDLER_SECONDS = Histogram("newsbot_handler_seconds", "訊息處理耗時（含回覆）", ("command",))
+EXPORT_SECONDS = Histogram("newsbot_export_seconds", "匯出工作耗時（不含排隊）", ("outcome",))
+EXPORT_QUEUE_DEPTH = Gauge("newsbot_export_queue_depth", "排隊中的匯出工作數")
+EXPORT_QUEUE_DEPTH.set_function(lambda: export_scheduler.queue_depth)
+EXPORT_RUNNING = Gauge("newsbot_export_running", "執行中的匯出工作數")
+EXPORT_RUNNING.set_function(lambda: export_scheduler.running_count)
+EXPORT_REJECTED = Counter("newsbot_export_rejected_total", "因佇列已滿而拒絕的匯出")
+STARTUP_SECONDS = Gauge(
+    "newsbot_startup_seconds", "啟動各階段距離程序開始執行的秒數（import / listening / prewarm / first_response）",
+    ("phase",),
+)
+
+def mark_startup(phase: str):
+    seconds = time.perf_counter() - _STARTED
+    STARTUP_SECONDS.set(seconds, phase)
+    logger.info(f"啟動階段 {phase}：{seconds:.3f} 秒")
+
+# ✅ 匯出進度訊息最短編輯間隔（秒）
+PROGRESS_INTERVAL = float(os.environ.get("EXPORT_PROGRESS_INTERVAL", 2.0))
+
+COMMAND_LABELS = {
+    "匯出": "export", "取消": "cancel", "清空": "clear", "清單": "list",
+    "刪除": "delete", "上移": "move", "下移": "move", "移動": "move",
+}
+
 # 載入 .env
 load_dotenv()
 
+# ✅ 使用者清單存放區：記憶體快取 + 批次寫回 SQLite（WAL），重啟或換實例後清單仍在
+session_store = SessionStore(
+    create_backend(
+        os.environ.get("SESSION_BACKEND", "sqlite").strip().lower(),
+        os.environ.get("SESSION_DB", "sessions.sqlite3"),
+    ),
+    flush_interval=float(os.environ.get("SESSION_FLUSH_INTERVAL", 1.0)),
+    factory=ClippingList,
+)
+
+mark_startup("import")
+
 def get_token() -> str:
     token = os.environ.get("TELEGRAM_TOKEN", "").strip()
     if not token:
         raise RuntimeError("環境變數 TELEGRAM_TOKEN 未設定。請在系統或 .env 檔中設定你的 Bot Token。")
     return token
 
-def extract_first_url(text: str) -> str | None:
-    match = re.search(r"(https?://\S+)", text or "")
-    return match.group(1) if match else None
+URL_RE = re.compile(r"https?://\S+")
+URL_ENTITY_TYPES = [MessageEntity.URL, MessageEntity.TEXT_LINK]
+
+def extract_urls(msg) -> list[str]:
+    """取出訊息（含圖說、轉傳訊息的連結實體）中所有網址，依出現順序並去除重複"""
+    found = []
+    for text, entities in (
+        (msg.text, msg.parse_entities(URL_ENTITY_TYPES)),
+        (msg.caption, msg.parse_caption_entities(URL_ENTITY_TYPES)),
+    ):
+        if entities:
+            # Telegram 已標出連結範圍，比正規表示式可靠（不會吃到後面的中文標點）
+            for entity, value in sorted(entities.items(), key=lambda pair: pair[0].offset):
+                found.append(entity.url if entity.type == MessageEntity.TEXT_LINK else value)
+        else:
+            found.extend(URL_RE.findall(text or ""))
+
+    urls = {}
+    for url in found:
+        if url.startswith(("http://", "https://")):
+            urls.setdefault(dedup_key(url), url)
+    return list(urls.values())
 
 async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     msg = update.message
-    user_text = (msg.text or "").strip()
+    text = (msg.text or msg.caption or "").strip()
+    command = next((label for prefix, label in COMMAND_LABELS.items() if text.startswith(prefix)), "links")
+    with HANDLER_SECONDS.time(command):
+        await _dispatch_message(update, context)
+
+    global _first_response
+    if _first_response:
+        _first_response = False
+        mark_startup("first_response")
+
+_first_response = True
+
+async def _dispatch_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    msg = update.message
+    user_text = (msg.text or msg.caption or "").strip()
+    user_id = update.effective_user.id
 
-    # ✅ 使用者輸入「匯出」
+    # ✅ 使用者輸入「匯出」：交給排程器，依序執行
     if user_text == "匯出":
-        urls = context.user_data.get("urls", [])
+        urls = await session_store.get(user_id)
         if not urls:
             await msg.reply_text("目前清單是空的，請先轉傳新聞網址。", disable_web_page_preview=True)
             return
 
-        await msg.reply_text(f"正在匯出 {len(urls)} 則新聞，請稍候…", disable_web_page_preview=True)
+        if export_scheduler.get(user_id) is not None:
+            await msg.reply_text("你已有一個匯出工作在進行中，輸入「取消」可取消。", disable_web_page_preview=True)
+            return
 
         try:
-            output_path = await export_to_word([item["url"] for item in urls])
-            await msg.reply_document(document=open(output_path, "rb"))
-            context.user_data["urls"] = []
-            logger.info("匯出完成，清單已清空。")
-        except Exception as e:
-            logger.error(f"匯出失敗：{e}")
-            await msg.reply_text(f"匯出失敗：{e}", disable_web_page_preview=True)
+            job = export_scheduler.submit(user_id, lambda: run_export(msg, context, user_id))
+        except ExportQueueFull:
+            await msg.reply_text("目前匯出的人數過多，請稍後再試。", disable_web_page_preview=True)
+            EXPORT_REJECTED.inc()
+            logger.warning("匯出佇列已滿。")
+            return
+
+        position = export_scheduler.position(job)
+        if position > 0:
+            await msg.reply_text(f"排隊中，第 {position} 位。輸入「取消」可取消匯出。", disable_web_page_preview=True)
+        return
+
+    # ✅ 使用者輸入「取消」
+    if user_text == "取消":
+        if export_scheduler.cancel(user_id):
+            await msg.reply_text("已取消匯出。", disable_web_page_preview=True)
+        else:
+            await msg.reply_text("目前沒有進行中的匯出。", disable_web_page_preview=True)
         return
 
     # ✅ 使用者輸入「清空」
     if user_text == "清空":
-        context.user_data["urls"] = []
+        urls = await session_store.get(user_id)
+        urls.clear()
+        session_store.mark_dirty(user_id)
         await msg.reply_text("清單已清空。", disable_web_page_preview=True)
         logger.info("使用者清空了清單。")
         return
 
     # ✅ 使用者輸入「清單」
     if user_text == "清單":
-        urls = context.user_data.get("urls", [])
+        urls = await session_store.get(user_id)
         if not urls:
             await msg.reply_text("目前清單是空的。", disable_web_page_preview=True)
         else:
@@ -76,9 +192,10 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
         parts = user_text.split()
         if len(parts) == 2 and parts[1].isdigit():
             idx = int(parts[1]) - 1
-            urls = context.user_data.get("urls", [])
+            urls = await session_store.get(user_id)
             if 0 <= idx < len(urls):
                 removed = urls.pop(idx)
+                session_store.mark_dirty(user_id)
                 await msg.reply_text(
                     f"已刪除第 {idx+1} 則新聞：{removed['title']} ({removed['url']})",
                     disable_web_page_preview=True
@@ -90,49 +207,300 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
             await msg.reply_text("請輸入正確格式，例如：刪除 2", disable_web_page_preview=True)
         return
 
-    # ✅ 處理新聞網址（排除重複）
-    url = extract_first_url(user_text)
-    if not url:
+    # ✅ 使用者輸入「上移 N」「下移 N」「移動 N 到 M」
+    if user_text.startswith(("上移", "下移", "移動")):
+        match = (
+            re.fullmatch(r"移動\s*(\d+)\s*到\s*(\d+)", user_text)
+            or re.fullmatch(r"(上移|下移)\s*(\d+)", user_text)
+        )
+        if not match:
+            await msg.reply_text("請輸入正確格式，例如：上移 2、下移 2、移動 3 到 1", disable_web_page_preview=True)
+            return
+
+        urls = await session_store.get(user_id)
+        if match.group(1) == "上移":
+            src = int(match.group(2)) - 1
+            dst = src - 1
+        elif match.group(1) == "下移":
+            src = int(match.group(2)) - 1
+            dst = src + 1
+        else:
+            src, dst = int(match.group(1)) - 1, int(match.group(2)) - 1
+        if not (0 <= src < len(urls) and 0 <= dst < len(urls)):
+            await msg.reply_text("編號不存在，請確認清單。", disable_web_page_preview=True)
+            return
+
+        moved = urls.move(src, dst)
+        session_store.mark_dirty(user_id)
+        await msg.reply_text(f"已將「{moved['title']}」移到第 {dst+1} 則。", disable_web_page_preview=True)
+        logger.info(f"第 {src+1} 則移到第 {dst+1} 則。")
+        return
+
+    # ✅ 處理新聞網址：一則訊息可含多個連結，一次查重、併發抓取
+    links = extract_urls(msg)
+    if not links:
         await msg.reply_text("請傳送新聞網址（需包含 http:// 或 https://）。", disable_web_page_preview=True)
         return
 
-    urls = context.user_data.setdefault("urls", [])
+    urls = await session_store.get(user_id)
+    added, duplicates, unsupported = [], [], []
+    for url in links:
+        if find_site(url) is None:
+            unsupported.append(url)
+        elif urls.find_url(url) is not None:
+            duplicates.append(url)
+        else:
+            added.append(urls.add(url, PENDING_TITLE))
 
-    try:
-        content = await fetch_content(url)
-        title = content.split("\n", 1)[0].strip() if content else "（未能抓取標題）"
-    except Exception:
-        title = "（未能抓取標題）"
+    if duplicates:
+        logger.warning(f"使用者嘗試加入重複新聞（{len(duplicates)} 則）。")
+    if not added:
+        await msg.reply_text(_ingest_reply(added, duplicates, unsupported, len(urls)), disable_web_page_preview=True)
+        return
 
-    if any(item["url"] == url or item["title"] == title for item in urls):
-        await msg.reply_text("這則新聞已在清單中，已排除重複。", disable_web_page_preview=True)
-        logger.warning("使用者嘗試加入重複新聞。")
-    else:
-        urls.append({"url": url, "title": title})
+    # ✅ 先加入清單並立即回覆，標題於背景抓取完成後補上（整批一個工作，重複的結果合併回覆）
+    session_store.mark_dirty(user_id)
+    pending = context.user_data.setdefault("pending", set())
+    task = context.application.create_task(prefetch_titles(msg, user_id, added), update=update)
+    pending.add(task)
+    task.add_done_callback(pending.discard)
+
+    await msg.reply_text(
+        _ingest_reply(added, duplicates, unsupported, len(urls)) + "\n"
+        f"輸入「匯出」整合成 Word。\n"
+        f"輸入「清單」查看清單。\n"
+        f"輸入「清空」清除清單。\n"
+        f"輸入「刪除 N」刪除指定新聞。\n"
+        f"輸入「上移 N」「下移 N」重新排序。\n"
+        f"輸入「移動 N 到 M」直接移到指定位置。\n",
+        disable_web_page_preview=True
+    )
+
+def _ingest_reply(added, duplicates, unsupported, total) -> str:
+    """整理一則訊息中各連結的處理結果"""
+    if len(added) == 1 and not duplicates and not unsupported:
+        return f"已加入清單，目前共有 {total} 則新聞。"
+    if not added and len(duplicates) == 1 and not unsupported:
+        return "這則新聞已在清單中，已排除重複。"
+
+    lines = [f"已加入 {len(added)} 則新聞，目前共有 {total} 則。"]
+    if duplicates:
+        lines.append(f"\n已在清單中（{len(duplicates)} 則，已排除重複）：")
+        lines.extend(f"- {url}" for url in duplicates)
+    if unsupported:
+        lines.append(f"\n目前尚未支援的來源（{len(unsupported)} 則，未加入）：")
+        lines.extend(f"- {url}" for url in unsupported)
+    return "\n".join(lines)
+
+async def prefetch_titles(msg, user_id, items):
+    """背景抓取同一則訊息加入的新聞；發現重複的彙整成一則回覆"""
+    results = await asyncio.gather(*(prefetch_title(user_id, item) for item in items), return_exceptions=True)
+    for result in results:
+        if isinstance(result, Exception):
+            logger.error(f"背景抓取標題失敗：{result}")
+    notes = [result for result in results if isinstance(result, str)]
+    if len(notes) == 1:
+        await msg.reply_text(f"{notes[0]}，已排除重複。", disable_web_page_preview=True)
+    elif notes:
         await msg.reply_text(
-            f"已加入清單，目前共有 {len(urls)} 則新聞。\n"
-            f"輸入「匯出」整合成 Word。\n"
-            f"輸入「清單」查看清單。\n"
-            f"輸入「清空」清除清單。\n"
-            f"輸入「刪除 N」刪除指定新聞。\n"
-            f"輸入「上移 N」「下移 N」重新排序。\n"
-            f"輸入「移動 N 到 M」直接移到指定位置。\n",
+            f"有 {len(notes)} 則新聞與清單重複，已排除：\n" + "\n".join(f"- {note}" for note in notes),
             disable_web_page_preview=True
         )
-        logger.info(f"加入新聞：{title} ({url})")
-
-def main(): 
-    token = get_token() 
-    application = Application.builder().token(token).build() 
-    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message)) 
-    # ✅ Webhook 模式 
-    port = int(os.environ.get("PORT", 8080)) # Cloud Run 會自動提供 PORT 
-    application.run_webhook( 
-        listen="0.0.0.0", 
-        port=port, 
-        url_path=token, # 用 token 當路徑，避免隨便人呼叫 
-        webhook_url=f"https://{os.environ.get('CLOUD_RUN_URL')}/{token}" 
-        # 這裡要填 Cloud Run 部署後的公開網址 
-    )
+
+async def prefetch_title(user_id, item: dict) -> str | None:
+    """背景抓取新聞內容（同時暖好快取），完成後補上標題；重複時移除並回傳說明"""
+    url = item["url"]
+    try:
+        from modules.fetch_content import fetch_content
+        result = await fetch_content(url)
+        title, paragraphs = result.display_title, result.paragraphs
+    except Exception:
+        title, paragraphs = NO_TITLE, ()
+
+    urls = await session_store.get(user_id)
+    if not urls.contains(item):
+        return None  # 抓取期間已被刪除或清空
+
+    if urls.has_title(title, exclude=item):
+        urls.remove(item)
+        session_store.mark_dirty(user_id)
+        logger.warning("使用者嘗試加入重複新聞。")
+        return f"「{title}」已在清單中"
+
+    # ✅ 不同媒體轉載的同一則稿件：內文 simhash 相近即視為重複
+    # 只有 CPU_OFFLOAD=process 時才移到子程序；預設直接在 event loop 上計算（長文約數毫秒）
+    content_hash = await run_cpu(simhash, "\n".join(paragraphs))
+    similar = urls.find_similar(content_hash, exclude=item)
+    if similar is not None:
+        urls.remove(item)
+        session_store.mark_dirty(user_id)
+        logger.warning("使用者嘗試加入內容相近的新聞。")
+        return f"「{title}」與清單中的「{similar['title']}」內容相近"
+
+    urls.update(item, title, content_hash)
+    session_store.mark_dirty(user_id)
+    logger.info(f"加入新聞：{title} ({url})")
+    return None
+
+async def run_export(msg, context: ContextTypes.DEFAULT_TYPE, user_id):
+    """排程器執行的匯出工作"""
+    # ✅ 等待背景抓取完成，匯出時直接使用快取內容
+    pending = context.user_data.get("pending")
+    if pending:
+        # asyncio.wait：匯出被取消時不會連帶取消背景抓取（否則項目會停在「標題抓取中」）
+        await asyncio.wait(set(pending))
+
+    items = list(await session_store.get(user_id))
+    if not items:
+        await msg.reply_text("目前清單是空的，請先轉傳新聞網址。", disable_web_page_preview=True)
+        return
+
+    from modules.export_word import export_parts
+
+    total = len(items)
+    status = await msg.reply_text(f"正在匯出 {total} 則新聞，請稍候…", disable_web_page_preview=True)
+    progress = ProgressMessage(status, interval=PROGRESS_INTERVAL)
+    fetched = 0
+    delivered = []  # 已送出的項目
+    failed = []     # 已送出、但抓取失敗的項目（保留在清單中供重試）
+    parts = 0
+
+    def status_text():
+        text = f"正在匯出 {total} 則新聞：已抓取 {fetched}/{total} 則"
+        if parts:
+            text += f"，已送出 {parts} 份（{len(delivered)} 則）"
+        return text + "…"
+
+    def on_progress(done, _):
+        nonlocal fetched
+        fetched = done
+        progress.update(status_text())
+
+    start = time.perf_counter()
+    try:
+        # aclosing：離開迴圈（取消、送出失敗）時立刻停止尚未完成的抓取，再更新最終狀態
+        async with aclosing(export_parts([item["url"] for item in items], on_progress=on_progress)) as exporter:
+            async for filename, document, articles in exporter:
+                with document:
+                    await msg.reply_document(document=document, filename=filename)
+                # 每送出一份就從清單移除，後面的份數失敗時已送出的不必重做
+                sent = items[len(delivered):len(delivered) + len(articles)]
+                delivered.extend(sent)
+                sent_failed = [item for item, article in zip(sent, articles) if not article.ok]
+                failed.extend(sent_failed)
+                parts += 1
+                await _remove_delivered(user_id, [item for item in sent if all(item is not f for f in sent_failed)])
+                progress.update(status_text())
+    except asyncio.CancelledError:
+        EXPORT_SECONDS.observe(time.perf_counter() - start, "cancelled")
+        await progress.close()
+        raise
+    except Exception as e:
+        EXPORT_SECONDS.observe(time.perf_counter() - start, "failed")
+        logger.error(f"匯出失敗：{e}")
+        if delivered:
+            await progress.close(
+                f"匯出中斷：已送出 {parts} 份（{len(delivered)} 則），其餘 {total - len(delivered)} 則仍在清單中。"
+            )
+        else:
+            await progress.close()
+        await msg.reply_text(f"匯出失敗：{e}", disable_web_page_preview=True)
+        return
+    EXPORT_SECONDS.observe(time.perf_counter() - start, "ok")
+
+    summary = f"匯出完成：共 {total} 則" + (f"，分成 {parts} 份" if parts > 1 else "") + "。"
+    if failed:
+        summary += f"\n其中 {len(failed)} 則抓取失敗，已保留在清單中，可稍後再匯出。"
+    await progress.close(summary)
+    logger.info(f"匯出完成：{total} 則，{parts} 份，失敗 {len(failed)} 則。")
+
+async def _remove_delivered(user_id, items):
+    """只移除已匯出的項目，匯出期間新加入的保留"""
+    urls = await session_store.get(user_id)
+    urls.remove_items(items)
+    session_store.mark_dirty(user_id)
+
+async def prewarm():
+    """開始接收 webhook 後在背景預熱：載入抓取 / 匯出模組、Word 範本、Chromium"""
+    try:
+        if "template" in PREWARM:
+            # import 與建立骨架都是 CPU 工作，放到執行緒以免卡住正在處理的訊息
+            export_word = await asyncio.to_thread(importlib.import_module, "modules.export_word")
+            await asyncio.to_thread(export_word.prewarm)
+        else:
+            await asyncio.to_thread(importlib.import_module, "modules.fetch_content")
+        if "browser" in PREWARM:
+            from modules.browser_manager import BrowserManager
+            await BrowserManager.get_instance().prewarm()
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        # 預熱失敗不影響服務：第一次使用時會再嘗試
+        logger.warning(f"背景預熱失敗：{e}")
+    mark_startup("prewarm")
+
+async def on_shutdown(application: Application):
+    """Application 關閉時釋放共用資源（只處理已載入的模組）"""
+    await export_scheduler.shutdown()  # 通常已在 stop() 前取消；啟動失敗時在這裡處理
+    await session_store.close()  # 寫回尚未存檔的清單
+    if "modules.http_client" in sys.modules:
+        from modules.http_client import close_client
+        await close_client()
+    if "modules.browser_manager" in sys.modules:
+        from modules.browser_manager import BrowserManager
+        await BrowserManager.shutdown()
+    if "modules.cpu_pool" in sys.modules:
+        from modules.cpu_pool import shutdown_pool
+        shutdown_pool()
+
+async def serve(token: str, port: int):
+    """自行架設 webhook 伺服器，與 /metrics 共用同一個 port"""
+    # updater(None)：更新由我們的 webhook handler 放進 update_queue
+    builder = Application.builder().token(token).updater(None)
+    if os.environ.get("TELEGRAM_API_URL"):
+        builder = builder.base_url(os.environ["TELEGRAM_API_URL"])  # 例如 bench_startup 的本機假 API
+    application = builder.build()
+    application.add_handler(MessageHandler((filters.TEXT | filters.CAPTION) & ~filters.COMMAND, handle_message))
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    # ✅ 先開始監聽：初始化（getMe）完成前收到的更新會在 update_queue 等待處理
+    server = build_web_app(application, f"/{token}").listen(port, address="0.0.0.0")  # 用 token 當路徑，避免隨便人呼叫
+    mark_startup("listening")
+    prewarm_task = None
+    try:
+        async with application:
+            await application.start()
+            # stop() 須在離開 async with 之前完成，否則 shutdown() 會拋出
+            # 「still running」並蓋掉真正的錯誤（例如 set_webhook 失敗）
+            try:
+                # 這裡要填 Cloud Run 部署後的公開網址
+                await application.bot.set_webhook(url=f"https://{os.environ.get('CLOUD_RUN_URL')}/{token}")
+                logger.info(f"Webhook 伺服器已啟動（port {port}），指標位於 /metrics。")
+                if PREWARM:
+                    prewarm_task = asyncio.create_task(prewarm())
+
+                await stop.wait()
+            finally:
+                server.stop()
+                # 先取消匯出工作（bot 仍可用），再停止 Application；stop() 可能要等背景抓取許久
+                await export_scheduler.shutdown()
+                await application.stop()
+    finally:
+        server.stop()
+        if prewarm_task is not None:
+            prewarm_task.cancel()
+        # 不經過 run_webhook 時 post_shutdown 不會被呼叫，改為在這裡釋放資源
+        await on_shutdown(application)
+
+def main():
+    token = get_token()
+    # ✅ Webhook 模式
+    port = int(os.environ.get("PORT", 8080))  # Cloud Run 會自動提供 PORT
+    asyncio.run(serve(token, port))
+
 if __name__ == "__main__":
     main()
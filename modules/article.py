@@ -0,0 +1,47 @@
+# modules/article.py
+from dataclasses import dataclass, field
+
+NO_TITLE = "（未能抓取標題）"
+
+# 失敗狀態對應的顯示文字（沿用原本嵌在文件中的寫法）
+_STATUS_TEXT = {
+    "unsupported": "目前尚未支援此來源",
+    "network_error": "網路錯誤",
+    "error": "抓取失敗",
+}
+
+
+@dataclass(frozen=True, slots=True)
+class ArticleResult:
+    """單則新聞的抓取結果；快取、清單、匯出與指標都直接使用欄位"""
+    url: str
+    source: str = ""
+    title: str = NO_TITLE
+    lead: str | None = None
+    paragraphs: tuple = ()
+    status: str = "ok"          # "ok" | "unsupported" | "network_error" | "error"
+    error: str | None = None    # 失敗原因（例如 FetchError 的說明）
+    error_kind: str | None = None  # FetchError.kind（timeout、circuit_open…）
+    tier: str | None = None     # "static" | "browser"
+    timings: dict = field(default_factory=dict, compare=False)  # 階段 -> 秒
+
+    @property
+    def ok(self) -> bool:
+        return self.status == "ok"
+
+    @property
+    def error_text(self) -> str:
+        """失敗時顯示的文字，例如「（網路錯誤: …）」"""
+        label = _STATUS_TEXT.get(self.status, self.status)
+        return f"（{label}: {self.error}）" if self.error else f"（{label}）"
+
+    @property
+    def display_title(self) -> str:
+        return self.title if self.ok else self.error_text
+
+    def body_text(self) -> str:
+        """Word 表格內文（只在產生文件時組合一次）"""
+        if not self.ok:
+            return self.error_text
+        lines = [self.title] if self.lead is None else [self.title, self.lead]
+        return "\n".join(lines + list(self.paragraphs))
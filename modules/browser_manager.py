@@ -1,56 +1,156 @@
 # modules/browser_manager.py
-from playwright.sync_api import sync_playwright, Error as PlaywrightError
-import threading
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+
+from playwright.async_api import async_playwright, Error as PlaywrightError
+
+from modules.metrics import Counter, Gauge
+
+logger = logging.getLogger("news-export-bot")
+
+# 同時開啟的分頁上限、每個 context 重複使用次數上限
+MAX_PAGES = int(os.environ.get("BROWSER_MAX_PAGES", 3))
+CONTEXT_MAX_USES = int(os.environ.get("BROWSER_CONTEXT_MAX_USES", 20))
+
+# 指定時 Chromium 一律經由此 proxy 連線（例如離線基準測試的本機伺服器）
+BROWSER_PROXY = os.environ.get("BROWSER_PROXY", "").strip()
+
+BROWSER_LAUNCHES = Counter("newsbot_browser_launches_total", "Chromium 啟動次數（含崩潰後重啟）")
+BROWSER_CONTEXTS = Counter("newsbot_browser_contexts_total", "新建立的 browser context 數")
+BROWSER_PAGES_IN_USE = Gauge("newsbot_browser_pages_in_use", "目前借出的分頁數")
+
+# 所有 context 共用的設定（沿用中時新聞網原本的桌機版設定）
+CONTEXT_OPTIONS = {
+    "viewport": {"width": 1920, "height": 1080},
+    "device_scale_factor": 1,
+    "is_mobile": False,
+    "has_touch": False,
+    "java_script_enabled": True,
+}
+
 
 class BrowserManager:
+    """整個程序共用一個 Chromium，以 context 池分配分頁（async 版）"""
     _instance = None
-    _instance_lock = threading.Lock()
 
-    def __init__(self):
-        self._owner_thread = threading.current_thread()  # 記錄建立者 thread
-        self.playwright = sync_playwright().start()
-        self.browser = self.playwright.chromium.launch(headless=True)
-        self.context = self.browser.new_context()
+    def __init__(self, max_pages=MAX_PAGES, max_uses=CONTEXT_MAX_USES):
+        self.playwright = None
+        self.browser = None
+        self._max_uses = max_uses
+        self._slots = asyncio.Semaphore(max_pages)
+        self._launch_lock = asyncio.Lock()
+        self._idle = []  # [(context, 已使用次數)]
         self._closed = False
-        self._lock = threading.Lock()
 
     @classmethod
     def get_instance(cls):
         if cls._instance is None:
-            with cls._instance_lock:
-                if cls._instance is None:
-                    cls._instance = BrowserManager()
+            cls._instance = BrowserManager()
         return cls._instance
 
-    def new_page(self):
-        # 僅允許在建立者 thread 建立/操作 Playwright
-        if threading.current_thread() is not self._owner_thread:
-            raise RuntimeError("BrowserManager.new_page() called from non-owner thread")
-        return self.context.new_page()
+    @classmethod
+    async def shutdown(cls):
+        """關閉共用瀏覽器（若曾啟動）"""
+        if cls._instance is not None:
+            await cls._instance.close()
+
+    def _browser_alive(self):
+        return self.browser is not None and self.browser.is_connected()
+
+    async def _ensure_browser(self):
+        """第一次使用時啟動 Chromium；瀏覽器崩潰時重新啟動"""
+        if self._browser_alive():
+            return self.browser
+        async with self._launch_lock:
+            if not self._browser_alive():
+                if self.browser is not None:
+                    logger.warning("Chromium 已中斷，重新啟動。")
+                    self._idle.clear()
+                if self.playwright is None:
+                    self.playwright = await async_playwright().start()
+                launch_options = {"headless": True}
+                if BROWSER_PROXY:
+                    launch_options["proxy"] = {"server": BROWSER_PROXY}
+                self.browser = await self.playwright.chromium.launch(**launch_options)
+                BROWSER_LAUNCHES.inc()
+                logger.info("Chromium 已啟動。")
+        return self.browser
+
+    async def prewarm(self):
+        """預先啟動 Chromium 並放一個 context 進池中，第一次渲染不必等待啟動"""
+        if self._closed:
+            return
+        browser = await self._ensure_browser()
+        if not self._idle:
+            BROWSER_CONTEXTS.inc()
+            self._idle.append((await browser.new_context(**CONTEXT_OPTIONS), 0))
 
-    def close(self):
-        with self._lock:
-            if self._closed:
-                return  # 已關閉過，避免重複關閉
+    async def _acquire_context(self):
+        while self._idle:
+            context, uses = self._idle.pop()
+            if context.browser is self.browser:
+                return context, uses
+        browser = await self._ensure_browser()
+        BROWSER_CONTEXTS.inc()
+        return await browser.new_context(**CONTEXT_OPTIONS), 0
 
-            if threading.current_thread() is not self._owner_thread:
-                raise RuntimeError("BrowserManager.close() called from non-owner thread")
+    async def _close_context(self, context):
+        try:
+            await context.close()
+        except PlaywrightError:
+            pass  # 瀏覽器已崩潰時 context 也一併失效
 
+    @asynccontextmanager
+    async def page(self):
+        """借出一個分頁；用完自動歸還，context 滿 N 次或出錯即汰換"""
+        if self._closed:
+            raise RuntimeError("BrowserManager 已關閉")
+
+        async with self._slots:
+            await self._ensure_browser()
+            context, uses = await self._acquire_context()
+            page = None
+            healthy = False
+            BROWSER_PAGES_IN_USE.inc()
             try:
-                if self.context:
-                    self.context.close()
-                    self.context = None
-                if self.browser:
-                    self.browser.close()
-                    self.browser = None
-                if self.playwright:
-                    self.playwright.stop()
-                    self.playwright = None
-                print("BrowserManager closed successfully")
-            except PlaywrightError as e:
-                print(f"Playwright error during close: {e}")
-            except Exception as e:
-                print(f"BrowserManager close failed: {e}")
+                page = await context.new_page()
+                yield page
+                healthy = True
             finally:
-                self._closed = True
+                BROWSER_PAGES_IN_USE.dec()
+                if page is not None:
+                    try:
+                        await page.close()
+                    except PlaywrightError:
+                        healthy = False
+                uses += 1
+                if healthy and uses < self._max_uses and not self._closed and self._browser_alive():
+                    self._idle.append((context, uses))
+                else:
+                    await self._close_context(context)
+
+    async def close(self):
+        if self._closed:
+            return  # 已關閉過，避免重複關閉
+        self._closed = True
+
+        try:
+            while self._idle:
+                context, _ = self._idle.pop()
+                await self._close_context(context)
+            if self.browser:
+                await self.browser.close()
+                self.browser = None
+            if self.playwright:
+                await self.playwright.stop()
+                self.playwright = None
+            logger.info("BrowserManager closed successfully")
+        except PlaywrightError as e:
+            logger.warning(f"Playwright error during close: {e}")
+        except Exception as e:
+            logger.warning(f"BrowserManager close failed: {e}")
+        finally:
+            if BrowserManager._instance is self:
                 BrowserManager._instance = None
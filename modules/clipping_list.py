@@ -0,0 +1,207 @@
+# modules/clipping_list.py
+import hashlib
+import os
+import re
+import unicodedata
+from collections import Counter, defaultdict
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+from modules.content_cache import canonical_url
+
+# 行動版 / AMP 子網域（與桌面版是同一篇文章）
+MIRROR_HOST_PREFIXES = ("www.", "m.", "mobile.", "amp.")
+AMP_PARAMS = {"amp", "outputtype", "output"}
+_AMP_PATH_RE = re.compile(r"(^/amp(?=/)|/amp/?$|\.amp(?=\.html?$|$))", re.IGNORECASE)
+
+# 近似重複：內容 simhash 的漢明距離上限（0 表示停用）
+NEAR_DUP_DISTANCE = int(os.environ.get("NEAR_DUP_DISTANCE", 3))
+SHINGLE_SIZE = 3
+MIN_SIMHASH_CHARS = 200  # 內文太短不比對，避免誤判
+
+_TITLE_STRIP_RE = re.compile(r"[\W_]+", re.UNICODE)
+
+
+def dedup_key(url: str) -> str:
+    """判斷重複用的網址鍵：在 canonical_url 之外，再合併 http/https、行動版網域與 AMP 網址"""
+    parts = urlsplit(canonical_url(url))
+    host = parts.netloc
+    for prefix in MIRROR_HOST_PREFIXES:
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+            break
+    path = _AMP_PATH_RE.sub("", parts.path).rstrip("/") or "/"
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k.lower() not in AMP_PARAMS]
+    return f"{host}{path}?{urlencode(query)}" if query else f"{host}{path}"
+
+
+def is_placeholder(title: str) -> bool:
+    """「（標題抓取中…）」「（未能抓取標題）」等暫代文字不列入比對"""
+    return not title or title.startswith("（")
+
+
+def normalize_title(title: str) -> str:
+    """標題比對鍵：全半形統一、轉小寫、去除空白與標點"""
+    return _TITLE_STRIP_RE.sub("", unicodedata.normalize("NFKC", title).lower())
+
+
+def simhash(text: str) -> int | None:
+    """以字元 shingle 計算 64 位元 simhash；內文太短時回傳 None"""
+    text = _TITLE_STRIP_RE.sub("", unicodedata.normalize("NFKC", text or ""))
+    if len(text) < MIN_SIMHASH_CHARS:
+        return None
+    shingles = {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+    digests = b"".join(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest() for shingle in shingles)
+
+    # 逐位元組統計（Counter 在 C 層計數），不必對每個 shingle 跑 64 次迴圈：
+    # 某位元為 1 的 shingle 過半數，該位元即為 1（等同 +1 / -1 權重總和 > 0）
+    value = 0
+    for byte_index in range(8):
+        ones = [0] * 8
+        for byte, count in Counter(digests[byte_index::8]).items():
+            for bit in range(8):
+                if byte >> bit & 1:
+                    ones[bit] += count
+        shift = (7 - byte_index) * 8  # digest 以 big-endian 解讀
+        for bit in range(8):
+            if 2 * ones[bit] > len(shingles):
+                value |= 1 << (shift + bit)
+    return value
+
+
+def _bands(value: int, distance: int):
+    """把 64 位元切成 distance+1 段；距離 ≤ distance 的兩個值至少有一段完全相同"""
+    count = distance + 1
+    width = 64 // count
+    for band in range(count):
+        bits = width if band < count - 1 else 64 - width * band
+        yield band, value >> (band * width) & ((1 << bits) - 1)
+
+
+class ClippingList:
+    """使用者的新聞清單（保持順序），附帶網址 / 標題 / 內容 simhash 索引，查重為 O(1)
+
+    項目是一般 dict（url、title、選填的 simhash），可直接序列化存入 SessionStore。
+    索引與順序無關，刪除、清空、排序都只需維護這幾個 dict。
+    """
+
+    def __init__(self, items=(), near_dup_distance=NEAR_DUP_DISTANCE):
+        self.near_dup_distance = near_dup_distance
+        self._items = []
+        self._urls = {}                  # dedup_key -> item
+        self._titles = Counter()         # normalize_title -> 數量
+        self._buckets = defaultdict(list)  # (段, 值) -> [item]
+        for item in items:
+            self._items.append(item)
+            self._index(item)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __getitem__(self, index):
+        return self._items[index]
+
+    # ---------- 索引 ----------
+
+    def _index(self, item):
+        self._urls[dedup_key(item["url"])] = item
+        if not is_placeholder(item["title"]):
+            self._titles[normalize_title(item["title"])] += 1
+        if item.get("simhash") is not None and self.near_dup_distance:
+            for band in _bands(item["simhash"], self.near_dup_distance):
+                self._buckets[band].append(item)
+
+    def _unindex(self, item):
+        key = dedup_key(item["url"])
+        if self._urls.get(key) is item:
+            del self._urls[key]
+        if not is_placeholder(item["title"]):
+            title_key = normalize_title(item["title"])
+            self._titles[title_key] -= 1
+            if self._titles[title_key] <= 0:
+                del self._titles[title_key]
+        if item.get("simhash") is not None and self.near_dup_distance:
+            for band in _bands(item["simhash"], self.near_dup_distance):
+                bucket = [other for other in self._buckets.get(band, ()) if other is not item]
+                if bucket:
+                    self._buckets[band] = bucket
+                else:
+                    self._buckets.pop(band, None)
+
+    # ---------- 查詢 ----------
+
+    def contains(self, item) -> bool:
+        return self._urls.get(dedup_key(item["url"])) is item
+
+    def find_url(self, url: str):
+        """同一篇文章（忽略追蹤參數、行動版、AMP）已在清單中時回傳該項目"""
+        return self._urls.get(dedup_key(url))
+
+    def has_title(self, title: str, exclude=None) -> bool:
+        """清單中（exclude 以外）是否已有相同標題"""
+        if is_placeholder(title):
+            return False
+        key = normalize_title(title)
+        count = self._titles[key]
+        if exclude is not None and not is_placeholder(exclude["title"]) and normalize_title(exclude["title"]) == key:
+            count -= 1
+        return count > 0
+
+    def find_similar(self, value: int | None, exclude=None):
+        """找出內容近似（simhash 漢明距離在上限內）的項目"""
+        if value is None or not self.near_dup_distance:
+            return None
+        for band in _bands(value, self.near_dup_distance):
+            for other in self._buckets.get(band, ()):
+                if other is not exclude and bin(other["simhash"] ^ value).count("1") <= self.near_dup_distance:
+                    return other
+        return None
+
+    # ---------- 修改 ----------
+
+    def add(self, url: str, title: str) -> dict:
+        item = {"url": url, "title": title}
+        self._items.append(item)
+        self._index(item)
+        return item
+
+    def update(self, item, title: str, simhash_value: int | None = None):
+        """補上背景抓取到的標題與內容 simhash"""
+        self._unindex(item)
+        item["title"] = title
+        if simhash_value is not None:
+            item["simhash"] = simhash_value
+        self._index(item)
+
+    def pop(self, index: int) -> dict:
+        item = self._items.pop(index)
+        self._unindex(item)
+        return item
+
+    def remove(self, item):
+        self.remove_items((item,))
+
+    def remove_items(self, items):
+        """移除指定的項目（依物件身分比對）"""
+        targets = {id(item) for item in items}
+        kept = []
+        for item in self._items:
+            if id(item) in targets:
+                self._unindex(item)
+            else:
+                kept.append(item)
+        self._items = kept
+
+    def clear(self):
+        self._items.clear()
+        self._urls.clear()
+        self._titles.clear()
+        self._buckets.clear()
+
+    def move(self, src: int, dst: int) -> dict:
+        """把第 src 則移到第 dst 的位置（0 起算）"""
+        item = self._items.pop(src)
+        self._items.insert(dst, item)
+        return item
@@ -0,0 +1,75 @@
+# modules/content_cache.py
+import os
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# 追蹤用參數（不影響文章內容）
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "msclkid", "yclid", "igshid",
+    "mc_cid", "mc_eid", "_ga", "ref_src", "spm",
+}
+TRACKING_PREFIXES = ("utm_",)
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def canonical_url(url: str) -> str:
+    """正規化網址：網域轉小寫、去除追蹤參數與錨點、參數排序"""
+    parts = urlsplit((url or "").strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+
+    query = [
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k.lower() not in TRACKING_PARAMS and not k.lower().startswith(TRACKING_PREFIXES)
+    ]
+    query.sort()
+
+    return urlunsplit((scheme, host, parts.path or "/", urlencode(query), ""))
+
+
+class ContentCache:
+    """具 TTL 的 LRU 快取；失敗結果只保留較短時間（negative cache）"""
+
+    def __init__(self, max_entries=512, ttl=1800, negative_ttl=60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries = OrderedDict()  # key -> (到期時間, 內容)
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key, value, ttl=None):
+        self._entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def set_failed(self, key, value):
+        self.set(key, value, ttl=self.negative_ttl)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# ✅ 整個程序共用：「加入」與「匯出」共用同一份內容
+CONTENT_CACHE = ContentCache(
+    max_entries=int(os.environ.get("CONTENT_CACHE_SIZE", 512)),
+    ttl=int(os.environ.get("CONTENT_CACHE_TTL", 1800)),
+    negative_ttl=int(os.environ.get("CONTENT_CACHE_NEGATIVE_TTL", 60)),
+)
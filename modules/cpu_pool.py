@@ -0,0 +1,74 @@
+# modules/cpu_pool.py
+import asyncio
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+# CPU_OFFLOAD=process 時，HTML 擷取與 Word 產生改在子程序執行
+CPU_OFFLOAD = os.environ.get("CPU_OFFLOAD", "").strip().lower() in ("1", "true", "process")
+
+
+def _cgroup_cpu_quota() -> float | None:
+    """cgroup 的 CPU 配額（CPU 數，可為小數）；沒有限制或讀不到時回傳 None
+
+    Docker --cpus、Cloud Run 以 CFS 配額限制 CPU，不會反映在 sched_getaffinity 上。
+    """
+    try:  # cgroup v2："<配額> <週期>" 或 "max <週期>"
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()[:2]
+        return None if quota == "max" else int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    try:  # cgroup v1：配額為 -1 表示不限制
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+            quota = int(f.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+            period = int(f.read())
+        return quota / period if quota > 0 and period > 0 else None
+    except (OSError, ValueError):
+        return None
+
+
+def available_cpus() -> int:
+    """實際可用的 CPU 數：CPU affinity 與 cgroup 配額取較小者（至少 1）"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    quota = _cgroup_cpu_quota()
+    if quota is not None:
+        cpus = min(cpus, math.ceil(quota))
+    return max(1, cpus)
+
+
+CPU_WORKERS = int(os.environ.get("CPU_WORKERS", 0)) or available_cpus()
+
+_executor = None
+
+
+def get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # spawn：避免在已有執行緒 / event loop 的程序中 fork
+        _executor = ProcessPoolExecutor(
+            max_workers=CPU_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _executor
+
+
+async def run_cpu(func, *args):
+    """執行 CPU 密集的函式；參數與回傳值須為可 pickle 的一般資料"""
+    if not CPU_OFFLOAD:
+        return func(*args)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), func, *args)
+
+
+def shutdown_pool():
+    """關閉子程序池（Application 關閉時呼叫）"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
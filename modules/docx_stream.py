@@ -0,0 +1,99 @@
+# modules/docx_stream.py
+import io
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+DOCUMENT_PART = "word/document.xml"
+
+# 骨架文件中用來切割 document.xml 的 processing instruction
+FIRST_START, FIRST_END = "stream-first", "stream-first-end"
+REST_START, REST_END = "stream-rest", "stream-rest-end"
+
+# XML 1.0 不允許的控制字元（python-docx 遇到會拋錯，這裡直接移除）
+_INVALID_XML_RE = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+_SPECIAL_RE = re.compile(r"([\t\r\n])")
+
+
+def strip_invalid_xml(text: str) -> str:
+    """移除 XML 不允許的字元（兩種匯出引擎共用，輸出才會一致）"""
+    return _INVALID_XML_RE.sub("", text)
+
+
+def run_content_xml(text: str) -> str:
+    """與 python-docx 的 run.text 設定結果相同的 XML：\\t → <w:tab/>、換行 → <w:br/>"""
+    parts = []
+    for chunk in _SPECIAL_RE.split(strip_invalid_xml(text)):
+        if chunk == "\t":
+            parts.append("<w:tab/>")
+        elif chunk in ("\r", "\n"):
+            parts.append("<w:br/>")
+        elif chunk:
+            space = ' xml:space="preserve"' if len(chunk.strip()) < len(chunk) else ""
+            parts.append(f"<w:t{space}>{escape(chunk)}</w:t>")
+    return "".join(parts)
+
+
+def _split_at(xml: bytes, name: str):
+    """在 <?name?> 處切成前後兩段（lxml 會在 target 後加空白）"""
+    before, after = re.split(rb"<\?" + re.escape(name.encode("utf-8")) + rb"\s*\?>", xml)
+    return before, after
+
+
+def _compile_block(xml: bytes, marks) -> tuple:
+    """把區塊 XML 依標記 run 切開：回傳 (固定片段, 欄位序號, 固定片段, …)"""
+    pattern = '<w:t(?: xml:space="preserve")?>(' + "|".join(map(re.escape, marks)) + ")</w:t>"
+    pieces = re.split(pattern.encode("utf-8"), xml)
+    slot_of = {mark.encode("utf-8"): idx for idx, mark in enumerate(marks)}
+    return tuple(slot_of[piece] if i % 2 else piece for i, piece in enumerate(pieces))
+
+
+def _render_block(block: tuple, values) -> bytes:
+    return b"".join(
+        run_content_xml(values[piece]).encode("utf-8") if isinstance(piece, int) else piece
+        for piece in block
+    )
+
+
+class StreamTemplate:
+    """由 python-docx 存出的「骨架」.docx 建立的串流範本
+
+    骨架的 document.xml 以 processing instruction 標出第一則（取代範本表格的位置）
+    與其餘各則（sectPr 之前）的原型區塊；原型中的標記 run 之後換成實際文字。
+    其餘 parts（styles、numbering、rels…）原封不動複製。
+    """
+
+    def __init__(self, package: bytes, marks):
+        with zipfile.ZipFile(io.BytesIO(package)) as source:
+            self.parts = [(info.filename, source.read(info)) for info in source.infolist()]
+
+        document = dict(self.parts)[DOCUMENT_PART]
+        head, rest = _split_at(document, FIRST_START)
+        first, rest = _split_at(rest, FIRST_END)
+        mid, rest = _split_at(rest, REST_START)
+        repeat, tail = _split_at(rest, REST_END)
+
+        self.head, self.mid, self.tail = head, mid, tail
+        self.first = _compile_block(first, marks)
+        self.repeat = _compile_block(repeat, marks)
+
+    def write(self, out, rows):
+        """rows：每則一組欄位值（對應 marks 的順序），可為產生器；document.xml 邊產生邊壓縮寫入"""
+        with zipfile.ZipFile(out, "w", compression=zipfile.ZIP_DEFLATED) as package:
+            for name, blob in self.parts:
+                if name != DOCUMENT_PART:
+                    package.writestr(name, blob)
+                    continue
+                with package.open(name, "w") as stream:
+                    stream.write(self.head)
+                    started = False
+                    for values in rows:
+                        if not started:
+                            stream.write(_render_block(self.first, values))
+                            stream.write(self.mid)
+                            started = True
+                        else:
+                            stream.write(_render_block(self.repeat, values))
+                    if not started:
+                        stream.write(self.mid)
+                    stream.write(self.tail)
@@ -0,0 +1,116 @@
+# modules/export_jobs.py
+import asyncio
+import logging
+from collections import deque
+
+logger = logging.getLogger("news-export-bot")
+
+
+class ExportQueueFull(RuntimeError):
+    """排隊人數已達上限"""
+
+
+class ExportJob:
+    """單一使用者的一次匯出工作"""
+
+    def __init__(self, user_id, run):
+        self.user_id = user_id
+        self.run = run            # 無參數的 async callable
+        self.task = None          # 開始執行後的 asyncio.Task
+        self.cancelled = False
+        self.done = asyncio.Event()
+
+    @property
+    def running(self):
+        return self.task is not None and not self.done.is_set()
+
+
+class ExportScheduler:
+    """程序內的匯出排程：全域同時執行上限、每位使用者同時只有一個工作、FIFO 排隊"""
+
+    def __init__(self, max_workers=2, max_queue=20):
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max_queue
+        self._waiting = deque()
+        self._jobs = {}           # user_id -> ExportJob（排隊中或執行中）
+        self._running = 0
+
+    @property
+    def queue_depth(self):
+        return len(self._waiting)
+
+    @property
+    def running_count(self):
+        return self._running
+
+    def get(self, user_id):
+        return self._jobs.get(user_id)
+
+    def submit(self, user_id, run) -> ExportJob:
+        """送出匯出工作；同一使用者已有工作時回傳原本那個"""
+        job = self._jobs.get(user_id)
+        if job is not None:
+            return job
+        if len(self._waiting) >= self.max_queue:
+            raise ExportQueueFull(f"排隊中的匯出已達上限（{self.max_queue}）")
+
+        job = ExportJob(user_id, run)
+        self._jobs[user_id] = job
+        self._waiting.append(job)
+        self._dispatch()
+        return job
+
+    def position(self, job) -> int:
+        """0 表示執行中；1 起為排隊順位"""
+        if job.task is not None:
+            return 0
+        try:
+            return self._waiting.index(job) + 1
+        except ValueError:
+            return 0
+
+    def cancel(self, user_id) -> bool:
+        """取消使用者排隊中或執行中的工作"""
+        job = self._jobs.get(user_id)
+        if job is None:
+            return False
+        job.cancelled = True
+        if job.task is None:
+            self._waiting.remove(job)
+            self._finish(job)
+        else:
+            job.task.cancel()
+        return True
+
+    def _dispatch(self):
+        while self._running < self.max_workers and self._waiting:
+            job = self._waiting.popleft()
+            self._running += 1
+            job.task = asyncio.create_task(self._run(job))
+
+    async def _run(self, job):
+        try:
+            await job.run()
+        except asyncio.CancelledError:
+            logger.info(f"匯出工作已取消（user={job.user_id}）。")
+        except Exception as e:
+            logger.error(f"匯出工作失敗（user={job.user_id}）：{e}")
+        finally:
+            self._running -= 1
+            self._finish(job)
+            self._dispatch()
+
+    def _finish(self, job):
+        if self._jobs.get(job.user_id) is job:
+            del self._jobs[job.user_id]
+        job.done.set()
+
+    async def shutdown(self):
+        """取消所有工作（Application 關閉時呼叫）"""
+        for job in list(self._waiting):
+            self.cancel(job.user_id)
+        running = [job.task for job in self._jobs.values() if job.task is not None]
+        for task in running:
+            task.cancel()
+        if running:
+            await asyncio.gather(*running, return_exceptions=True)
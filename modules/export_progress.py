@@ -0,0 +1,66 @@
+# modules/export_progress.py
+import asyncio
+import logging
+import time
+
+from telegram.error import TelegramError
+
+logger = logging.getLogger("news-export-bot")
+
+
+class ProgressMessage:
+    """匯出狀態訊息：進度以編輯同一則訊息呈現，並限制編輯頻率（Telegram 有速率限制）
+
+    update() 為同步函式，可直接當作進度回呼；兩次編輯之間的更新會合併，只送出最新內容。
+    close() 之後的 update() 一律忽略，不會蓋掉最終狀態。
+    """
+
+    def __init__(self, message, interval: float = 2.0):
+        self.message = message
+        self.interval = interval
+        self._shown = message.text
+        self._latest = None
+        self._last_edit = 0.0
+        self._task = None
+        self._closed = False
+
+    def update(self, text: str):
+        if self._closed:
+            return
+        self._latest = text
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._edit_later())
+
+    async def _edit_later(self):
+        while True:
+            delay = self._last_edit + self.interval - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            text = self._latest
+            await self._edit(text)
+            if self._latest == text:
+                return  # 編輯期間沒有新的進度
+
+    async def _edit(self, text: str):
+        if text == self._shown:
+            return
+        try:
+            await self.message.edit_text(text, disable_web_page_preview=True)
+        except TelegramError as e:
+            # 進度只是輔助資訊：編輯失敗（例如頻率限制）不影響匯出
+            logger.debug(f"更新匯出進度失敗：{e}")
+        else:
+            self._shown = text
+        self._last_edit = time.monotonic()
+
+    async def close(self, text: str | None = None):
+        """停止尚未送出的更新；有 text 時立即改成最終狀態"""
+        self._closed = True
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task  # 等已送出的編輯結束，才不會在最終狀態之後抵達
+            except asyncio.CancelledError:
+                pass
+        if text is not None:
+            await self._edit(text)
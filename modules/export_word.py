@@ -1,42 +1,48 @@
+import asyncio
 import datetime
+import io
+import os
+import uuid
 from copy import deepcopy
 from urllib.parse import urlparse
 from docx import Document
 from docx.shared import Pt
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 from docx.oxml.ns import qn
+from lxml import etree
 
+from modules.article import ArticleResult
 from modules.fetch_content import fetch_content
+from modules.sites import SITES, find_site
+from modules.cpu_pool import run_cpu
+from modules.docx_stream import FIRST_END, FIRST_START, REST_END, REST_START, StreamTemplate, strip_invalid_xml
+from modules.metrics import Counter, Histogram
 
-# ✅ 來源對應字典
-SOURCE_MAP = {
-    "nextapple.com": "壹蘋網",
-    "ctinews.com": "中天網",
-    "ctitv.com.tw": "中天網",
-    "cti.com.tw": "中天網",
-    "knews.com.tw": "知新聞",
-    "ebc.net.tw": "東森網",
-    "ctwant.com": "周刊王",
-    "setn.com": "三立網",
-    "ettoday.net": "東森雲",
-    "udn.com": "聯合新聞網",
-    "chinatimes.com": "中時新聞網",
-    "mirrordaily.news": "鏡報",
-    "tvbs.com.tw": "TVBS",
-    "mirrormedia.mg": "鏡週刊",
-    "mnews.tw": "鏡新聞",
-    "ltn.com.tw": "自由時報",
-    "cna.com.tw": "中央社",
-}
+# 抓取併發上限（全域 / 每個網域）
+FETCH_CONCURRENCY = int(os.environ.get("EXPORT_FETCH_CONCURRENCY", 8))
+FETCH_PER_DOMAIN = int(os.environ.get("EXPORT_FETCH_PER_DOMAIN", 2))
+
+# 產生文件的方式："docx"（python-docx 物件樹）、"stream"（串流寫出 XML）、
+# "auto"（則數達 EXPORT_STREAM_THRESHOLD 時用 stream）
+EXPORT_ENGINE = os.environ.get("EXPORT_ENGINE", "auto").strip().lower()
+STREAM_THRESHOLD = int(os.environ.get("EXPORT_STREAM_THRESHOLD", 20))
+
+# 每份 .docx 最多幾則（0 表示不分割）；分割時第一份完成即可先送出
+PART_SIZE = int(os.environ.get("EXPORT_PART_SIZE", 0))
+
+# ✅ 指標：匯出各階段耗時與則數
+EXPORT_PHASE_SECONDS = Histogram("newsbot_export_phase_seconds", "匯出各階段耗時（fetch / build）", ("phase",))
+EXPORT_ARTICLES = Counter("newsbot_export_articles_total", "已匯出的新聞則數", ("status",))
+
+# ✅ 來源對應字典（由站台設定產生）
+SOURCE_MAP = {host: spec.source for spec in SITES for host in spec.hosts}
 
 def _source_from_url(url: str) -> str:
     """依網址網域判斷報別"""
-    host = urlparse(url).hostname or ""
-    host = host.lower()
-    for key, source in SOURCE_MAP.items():
-        if key in host:
-            return source
-    return host  # 預設用網域當來源
+    spec = find_site(url)
+    if spec is not None:
+        return spec.source
+    return (urlparse(url).hostname or "").lower()  # 預設用網域當來源
 
 def _set_cell_style(cell, text, center=True, font_name="標楷體", font_size=14):
     """設定儲存格文字樣式"""
@@ -48,55 +54,228 @@ def _set_cell_style(cell, text, center=True, font_name="標楷體", font_size=14
             run._element.rPr.rFonts.set(qn("w:eastAsia"), font_name or "Arial")
             run.font.size = Pt(font_size)
 
-async def export_to_word_from_urls(urls, filename="新聞剪報.docx"):
-    """接收 URL 清單，抓取新聞並匯出 Word 檔（async 版）"""
-    try:
-        template = Document("templates/新聞輸出範本.docx")
-        doc = Document("templates/新聞輸出範本.docx")
-    except FileNotFoundError as e:
-        raise RuntimeError(f"範本檔不存在：{e}")
-    except Exception as e:
-        raise RuntimeError(f"無法開啟範本檔：{e}")
+def _start_fetches(urls, concurrency=FETCH_CONCURRENCY, per_domain=FETCH_PER_DOMAIN):
+    """為每個網址建立抓取工作（依序取得併發名額，前面的先抓），回傳 Task 清單"""
+    global_slot = asyncio.Semaphore(max(1, concurrency))
+    domain_slots = {}
 
-    base_title_el = template.paragraphs[0]._element
-    base_table_el = template.tables[0]._element
+    async def _fetch_one(url):
+        host = (urlparse(url).hostname or "").lower()
+        domain_slot = domain_slots.setdefault(host, asyncio.Semaphore(max(1, per_domain)))
+        async with domain_slot, global_slot:
+            try:
+                return await fetch_content(url)
+            except Exception as e:
+                return ArticleResult(url=url, source=_source_from_url(url), status="error", error=str(e))
 
-    now = datetime.datetime.now()
-    roc_year = now.year - 1911
-    roc_date = f"{roc_year}-{now.strftime('%m-%d')}"  # ✅ 改用 strftime
+    return [asyncio.ensure_future(_fetch_one(url)) for url in urls]
 
-    for idx, url in enumerate(urls, start=1):
-        source = _source_from_url(url)
+async def _fetch_all(urls, concurrency=FETCH_CONCURRENCY, per_domain=FETCH_PER_DOMAIN):
+    """併發抓取所有新聞，回傳 ArticleResult 清單，順序與 urls 相同"""
+    return await asyncio.gather(*_start_fetches(urls, concurrency, per_domain))
 
-        if idx == 1:
-            target_table = doc.tables[0]
-        else:
-            new_title_el = deepcopy(base_title_el)
-            new_tbl_el = deepcopy(base_table_el)
-            doc.element.body.append(new_title_el)
-            doc.element.body.append(new_tbl_el)
-            target_table = doc.tables[-1]
-
-        # 填入表格欄位
-        _set_cell_style(target_table.cell(0, 1), roc_date)      # 日期
-        _set_cell_style(target_table.cell(0, 3), source)        # 報別
-        _set_cell_style(target_table.cell(0, 5), str(idx))      # 頁碼
-        _set_cell_style(target_table.cell(1, 1), "社會")        # 版別（暫時固定）
+def _roc_date(now: datetime.datetime) -> str:
+    return f"{now.year - 1911}-{now.strftime('%m-%d')}"  # ✅ 改用 strftime
+
+def _unique_filename(now: datetime.datetime, part: int | None = None) -> str:
+    """每次匯出各自的檔名，避免同時匯出互相覆蓋；分割時加上份數"""
+    suffix = f"_第{part}份" if part is not None else ""
+    return f"新聞剪報_{now.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}{suffix}.docx"
+
+TEMPLATE_PATH = "templates/新聞輸出範本.docx"
+
+# 標記文字（私用區字元），用來在預先套好樣式的表格中定位要填入的 run
+_SOURCE_MARK = "\ue000"
+_PAGE_MARK = "\ue001"
+_BODY_MARK = "\ue002"
+
+_template = None      # 解析後的範本（只讀，不直接修改）
+_prototypes = {}      # 日期 -> (標題段落, 已套樣式的表格, 要填入的 run 位置)
+_stream_templates = {}  # 日期 -> StreamTemplate
 
+def _load_template():
+    """範本每個程序只解析一次"""
+    global _template
+    if _template is None:
         try:
-            # ✅ async 呼叫 fetch_content
-            content = await fetch_content(url)
+            _template = Document(TEMPLATE_PATH)
+        except FileNotFoundError as e:
+            raise RuntimeError(f"範本檔不存在：{e}")
         except Exception as e:
-            content = f"（抓取失敗: {e}）"
+            raise RuntimeError(f"無法開啟範本檔：{e}")
+    return _template
+
+def _prototype(roc_date: str):
+    """預先套好樣式、填好固定欄位的標題段落與表格（依日期快取）"""
+    proto = _prototypes.get(roc_date)
+    if proto is not None:
+        return proto
+
+    # 在複本上套樣式；範本本身不經由 python-docx 物件存取，確保 deepcopy 後結構一致
+    scratch = deepcopy(_load_template())
+    table = scratch.tables[0]
+    body_style = table.cell(2, 0).paragraphs[0].style if table.cell(2, 0).paragraphs else None
+
+    _set_cell_style(table.cell(0, 1), roc_date)       # 日期
+    _set_cell_style(table.cell(0, 3), _SOURCE_MARK)   # 報別
+    _set_cell_style(table.cell(0, 5), _PAGE_MARK)     # 頁碼
+    _set_cell_style(table.cell(1, 1), "社會")         # 版別（暫時固定）
+
+    body_cell = table.cell(2, 0)
+    body_cell.text = _BODY_MARK
+    if body_style is not None:
+        body_cell.paragraphs[0].style = body_style
+
+    runs = list(table._element.iter(qn("w:r")))
+    slots = tuple(
+        next(i for i, r in enumerate(runs) if r.text == mark)
+        for mark in (_SOURCE_MARK, _PAGE_MARK, _BODY_MARK)
+    )
+    proto = (scratch.paragraphs[0]._element, table._element, slots)
+    _prototypes.clear()  # 只保留當天的
+    _prototypes[roc_date] = proto
+    return proto
+
+def _new_block(proto, source: str, page: int, content: str):
+    """由原型複製一組表格並填入報別、頁碼與內文"""
+    _, table_el, (source_idx, page_idx, body_idx) = proto
+    new_tbl_el = deepcopy(table_el)
+    runs = list(new_tbl_el.iter(qn("w:r")))
+    runs[source_idx].text = strip_invalid_xml(source)
+    runs[page_idx].text = str(page)
+    runs[body_idx].text = strip_invalid_xml(content)  # 換行會轉成 <w:br/>
+    return new_tbl_el
+
+def render_document(articles, roc_date: str, first_page: int = 1) -> bytes:
+    """由 ArticleResult 清單產生 .docx 內容（可在子程序執行，只傳遞一般資料）"""
+    proto = _prototype(roc_date)
+    doc = deepcopy(_load_template())
+    body = doc.element.body
+    sect_pr = body.find(qn("w:sectPr"))
+
+    for idx, article in enumerate(articles, start=first_page):
+        new_tbl_el = _new_block(proto, article.source, idx, article.body_text())
+
+        if idx == first_page:
+            # 第一則直接取代範本原有的表格
+            body.replace(body.find(qn("w:tbl")), new_tbl_el)
+        else:
+            # 其餘各則（標題 + 表格）依序插在 sectPr 之前
+            for el in (deepcopy(proto[0]), new_tbl_el):
+                if sect_pr is not None:
+                    sect_pr.addprevious(el)
+                else:
+                    body.append(el)
+
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+def _stream_template(roc_date: str) -> StreamTemplate:
+    """串流用骨架：與 render_document 相同的位置放入原型區塊，以 PI 標出，存檔一次後切割"""
+    template = _stream_templates.get(roc_date)
+    if template is not None:
+        return template
+
+    title_el, table_el, _ = _prototype(roc_date)
+    doc = deepcopy(_load_template())
+    body = doc.element.body
+    sect_pr = body.find(qn("w:sectPr"))
+
+    # 第一則：取代範本原有的表格
+    first = body.find(qn("w:tbl"))
+    for el in (etree.PI(FIRST_START), deepcopy(table_el), etree.PI(FIRST_END)):
+        first.addprevious(el)
+    body.remove(first)
+
+    # 其餘各則：標題 + 表格，插在 sectPr 之前
+    for el in (etree.PI(REST_START), deepcopy(title_el), deepcopy(table_el), etree.PI(REST_END)):
+        if sect_pr is not None:
+            sect_pr.addprevious(el)
+        else:
+            body.append(el)
+
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    template = StreamTemplate(buffer.getvalue(), (_SOURCE_MARK, _PAGE_MARK, _BODY_MARK))
+    _stream_templates.clear()  # 只保留當天的
+    _stream_templates[roc_date] = template
+    return template
+
+def render_document_stream(articles, roc_date: str, first_page: int = 1) -> bytes:
+    """與 render_document 相同的版面，但逐則寫出 XML，不建立整份文件的物件樹"""
+    buffer = io.BytesIO()
+    _stream_template(roc_date).write(
+        buffer,
+        ((article.source, str(idx), article.body_text()) for idx, article in enumerate(articles, start=first_page)),
+    )
+    return buffer.getvalue()
+
+def prewarm():
+    """預先載入範本並建立今天的串流骨架（啟動後在背景執行）"""
+    _stream_template(_roc_date(datetime.datetime.now()))
+
+def _renderer(count: int):
+    if EXPORT_ENGINE == "stream" or (EXPORT_ENGINE == "auto" and count >= STREAM_THRESHOLD):
+        return render_document_stream
+    return render_document
+
+async def export_parts(urls, part_size=PART_SIZE, on_progress=None,
+                       concurrency=FETCH_CONCURRENCY, per_domain=FETCH_PER_DOMAIN):
+    """抓取並逐份產生 Word 檔（async generator）
+
+    每份產生 (檔名, BytesIO, 該份的 ArticleResult 清單)；part_size 為 0 時只有一份。
+    所有網址一開始就依序開始抓取，前面的份數抓完即可先產生，不必等全部完成。
+    單則抓取失敗只會在該則留下錯誤說明，不影響其他則。
+    on_progress(已完成則數, 總則數)：每抓完一則呼叫一次（同步函式）。
+    """
+    now = datetime.datetime.now()
+    roc_date = _roc_date(now)
+
+    total = len(urls)
+    size = part_size if 0 < part_size < total else max(total, 1)
+    part_count = -(-total // size)
+
+    tasks = _start_fetches(urls, concurrency, per_domain)
+    if on_progress is not None:
+        done = 0
+
+        def _on_done(task):
+            nonlocal done
+            if task.cancelled():
+                return  # 中途取消時停止的抓取不算完成
+            done += 1
+            on_progress(done, total)
+
+        for task in tasks:
+            task.add_done_callback(_on_done)
+
+    try:
+        for part, start in enumerate(range(0, total, size), start=1):
+            with EXPORT_PHASE_SECONDS.time("fetch"):
+                articles = await asyncio.gather(*tasks[start:start + size])
+
+            # ✅ 頁碼跨份連續編號
+            with EXPORT_PHASE_SECONDS.time("build"):
+                data = await run_cpu(_renderer(len(articles)), articles, roc_date, start + 1)
+            for article in articles:
+                EXPORT_ARTICLES.inc(article.status)
 
-        body_cell = target_table.cell(2, 0)
-        body_cell.text = content
+            filename = _unique_filename(now, part if part_count > 1 else None)
+            yield filename, io.BytesIO(data), articles
+    finally:
+        # 中途取消或失敗時，停止尚未完成的抓取
+        for task in tasks:
+            task.cancel()
 
-        if template.tables[0].cell(2, 0).paragraphs:
-            body_cell.paragraphs[0].style = template.tables[0].cell(2, 0).paragraphs[0].style
+async def export_to_word_from_urls(urls, filename=None,
+                                   concurrency=FETCH_CONCURRENCY, per_domain=FETCH_PER_DOMAIN):
+    """接收 URL 清單，抓取新聞並匯出 Word 檔（async 版）
 
-    doc.save(filename)
-    return filename
+    回傳 (檔名, BytesIO)；文件只存在記憶體中，不落地。
+    """
+    async for name, document, _ in export_parts(urls, part_size=0, concurrency=concurrency, per_domain=per_domain):
+        return filename or name, document
 
 # ✅ 提供別名，讓 Bot 可以用 export_to_word
 export_to_word = export_to_word_from_urls
@@ -1,525 +1,308 @@
-import requests
-import urllib3
-from bs4 import BeautifulSoup
+import asyncio
+import time
+import httpx
 import sys, os
-import re
-from playwright.async_api import async_playwright
+from contextlib import contextmanager
+from urllib.parse import urlparse
 
 # 路徑設定：優先載入上層模組
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-# 關閉 SSL 警告
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-
-# 常用正則集中化
-DATE_RE = re.compile(r"\d{4}[./]\d{2}[./]\d{2}")
-CAPTION_RE = re.compile(r"（[^）]*(?:攝|提供)[^）]*）$")
-
-# 各新聞來源的過濾字典
-EXCLUDE_KEYWORDS = {
-    "ctinews": ["標籤","留言","追蹤我們","新聞分類","影音專區","關於我們","客服資訊","聯絡我們","版權","China Times Group"],
-    "knews": ["延伸閱讀","相關新聞","版權","客服","追蹤","推薦新聞","下載","App","◎加入"],
-    "ebc": ["延伸閱讀","相關新聞","版權","更多新聞","App","下載","優惠","折扣","滿額","品牌","活動"],
-    "ctwant": ["延伸閱讀","相關新聞","更多精彩內容","版權","客服","追蹤","下載","App","立即訂閱","精彩影音","圖／","請用微信掃描","掃描 QR Code","更多 CTWANT 報導","安裝我們的 CTWANT APP","下一則新聞","人氣新聞","關鍵熱搜","隱私權政策","©","iPhone立即安裝","Android立即安裝"],
-    "setn": ["保護被害人隱私","拒絕家庭暴力","請撥打110","請撥打113","彰化夫妻","活春宮","更多新聞","延伸閱讀","版權所有","三立新聞網"],
-    "ettoday": ["延伸閱讀","相關新聞","更多新聞","版權所有","ETtoday新聞雲","請用微信掃描","掃描 QR Code","安裝我們的 APP","精彩影音","隱私權政策","©","iPhone立即安裝","Android立即安裝","▲"],
-    "udn": ["延伸閱讀","相關新聞","更多新聞","版權所有","聯合新聞網","隱私權政策","©","App下載","立即訂閱","精彩影音","本報資料照片"],
-    "chinatimes": ["延伸閱讀","相關新聞","更多新聞","版權所有","中時新聞網","隱私權政策","©","App下載","立即訂閱","精彩影音"],
-    "mirrordaily": ["猜你喜歡","其他人都在看","相關新聞","延伸閱讀","推薦","更多","追蹤","分享","版權","隱私權","服務條款","留言","訂閱","App","下載","TOP","返回","社群","熱門","最新"],
-    "tvbs": ["延伸閱讀","相關新聞","更多新聞","版權所有","TVBS新聞網","隱私權政策","©","App下載","立即訂閱","精彩影音","◤","👉","優惠","折扣","滿額","活動","旅遊優惠","加入TVBS新聞LINE","TVBS鐵粉","下載APP","免費拿點數","抽iPhone","eSIM","韓亞航空","訂房最便宜","省錢攻略"],
-    "mirrormedia": ["延伸閱讀","相關新聞","更多新聞","版權所有","鏡週刊","隱私權政策","©","App下載","立即訂閱","精彩影音","留言","熱門新聞","TOP","返回","社群分享","翻攝","照片","圖片","臉書","Instagram"],
-    "mnews": ["延伸閱讀","相關新聞","更多新聞","版權所有","鏡新聞","隱私權政策","©","App下載","立即訂閱","精彩影音","留言","熱門新聞","TOP","返回","社群分享","翻攝","照片","圖片","臉書","Instagram"]
-}
-
-async def fetch_content(url: str) -> str:
+from modules.article import NO_TITLE, ArticleResult
+from modules.http_client import BROWSER_HEADERS, fetch_revalidated
+from modules.content_cache import CONTENT_CACHE, canonical_url
+from modules.parsing import make_soup
+# DATE_RE / CAPTION_RE / EXCLUDE_KEYWORDS 保留舊的匯入路徑
+from modules.sites import DATE_RE, CAPTION_RE, EXCLUDE_KEYWORDS, SITES_BY_KEY, find_site
+from modules.cpu_pool import run_cpu
+from modules.raw_store import RAW_STORE
+from modules.metrics import Counter, Histogram
+from modules.resilience import FetchError, call_with_resilience
+from modules.structured_data import structured_article
+
+# 瀏覽器渲染的自適應逾時下限（秒）；上限為各站設定的 timeout
+RENDER_MIN_TIMEOUT = float(os.environ.get("RENDER_MIN_TIMEOUT", 10))
+WAIT_FOR_TIMEOUT = 10000
+
+# ✅ 指標：各站抓取次數與各階段耗時
+FETCH_TOTAL = Counter("newsbot_fetch_total", "新聞抓取次數（含快取命中）", ("site", "outcome"))
+FETCH_SECONDS = Histogram("newsbot_fetch_seconds", "未命中快取時單則新聞的抓取總耗時", ("site",))
+FETCH_PHASE_SECONDS = Histogram("newsbot_fetch_phase_seconds", "抓取各階段耗時", ("site", "phase"))
+FETCH_TIER = Counter("newsbot_fetch_tier_total", "最終採用的抓取方式（static / browser）", ("site", "tier"))
+
+# STATIC_FIRST=0 時 browser 站台一律直接渲染
+STATIC_FIRST = os.environ.get("STATIC_FIRST", "1").strip().lower() not in ("0", "false", "no")
+
+async def _render(url: str, timeout: int = 30000, headers: dict | None = None, wait_for: str | None = None,
+                  resources=None, wait_until: str = "domcontentloaded", site: str = "") -> str:
+    """以共用 Chromium 池渲染頁面，回傳 HTML（逾時依網域延遲調整，上限為 timeout 毫秒）
+
+    resources：要攔截的資源（ResourcePolicy）；wait_until="commit" 搭配 wait_for 時，
+    選擇器一出現就取內容，不等整頁載入（wait_for 須標示內文結束處）。
+    """
+    # 第一次渲染時才載入 playwright（純 HTTP 的站台用不到，啟動時不必付出載入成本）
+    from modules.browser_manager import BrowserManager
+    from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+    if not wait_for:
+        wait_until = "domcontentloaded"  # 沒有可等待的選擇器時仍需等 DOM 完成
+
+    async def attempt(attempt_timeout):
+        timeout_ms = attempt_timeout * 1000
+        async with BrowserManager.get_instance().page() as page:
+            if resources is not None:
+                await resources.install(page, site)
+            if headers:
+                await page.set_extra_http_headers(headers)
+            await page.goto(url, timeout=timeout_ms, wait_until=wait_until)
+            if wait_for:
+                selector_timeout = min(WAIT_FOR_TIMEOUT, timeout_ms)
+                try:
+                    await page.wait_for_selector(wait_for, timeout=selector_timeout)
+                except PlaywrightTimeoutError as e:
+                    # 頁面已回應、只是沒有內文區塊：不是網域變慢，不重試也不計入延遲
+                    raise FetchError("no_content", url, str(e)) from e
+            return await page.content()
+
+    ceiling = timeout / 1000
+    return await call_with_resilience(
+        url, "browser", attempt, default=ceiling, floor=min(RENDER_MIN_TIMEOUT, ceiling), ceiling=ceiling,
+    )
+
+async def render_site(url: str, spec) -> str:
+    """依站台設定渲染（headers、等待條件、資源攔截）"""
+    return await _render(
+        url, timeout=spec.timeout, headers=spec.headers, wait_for=spec.wait_for,
+        resources=spec.resources, wait_until=spec.wait_until, site=spec.key,
+    )
+
+def _extract_title(soup, selectors) -> str:
+    for selector in selectors:
+        tag = soup.select_one(selector)
+        if tag is None:
+            continue
+        if tag.name == "meta":
+            content = (tag.get("content") or "").strip()
+            if content:
+                return content
+            continue
+        return tag.get_text(strip=True)
+    return NO_TITLE
+
+def _containers(soup, block, whole_page=True):
+    """whole_page=False 時不退回整頁（selectors 中的 None），只接受真正的內文容器"""
+    if block.all_matches:
+        return soup.select(block.selectors[0])
+    for selector in block.selectors:
+        if selector is None:
+            return [soup] if whole_page else []
+        found = soup.select_one(selector)
+        if found is not None:
+            return [found]
+    return []
+
+def _block_texts(container, block):
+    if block.mode == "strings":
+        yield from container.stripped_strings
+        return
+    for p in container.find_all("p"):
+        if block.skip_linked and p.find("a"):
+            continue
+        if block.skip_figure and (p.find_parent("figure") or p.find_parent("figcaption")):
+            continue
+        yield p.get_text(strip=True)
+
+def _accept(spec, block, text) -> bool:
+    if not text or len(text) < block.min_len:
+        return False
+    if not block.filtered:
+        return True
+    if spec.reject.search(text):
+        return False
+    if spec.keep_prefixes and text.startswith(spec.keep_prefixes):
+        return True
+    return not spec.exclude.search(text)
+
+def _iter_texts(spec, soup, whole_page=True):
+    for block in spec.body:
+        for container in _containers(soup, block, whole_page):
+            for text in _block_texts(container, block):
+                yield block, text
+
+def _extract_paragraphs(spec, soup, whole_page=True) -> list:
+    paragraphs = []
+    for block, text in _iter_texts(spec, soup, whole_page):
+        if spec.stop and paragraphs and spec.stop(text):
+            break
+        if _accept(spec, block, text):
+            paragraphs.append(text)
+    if spec.dedup:
+        paragraphs = list(dict.fromkeys(paragraphs))
+    return paragraphs
+
+def _structured_paragraphs(spec, html: str):
+    """JSON-LD / __NEXT_DATA__ 中的內文，套用與一般段落相同的過濾"""
+    found = structured_article(html)
+    if found is None:
+        return None, []
+    title, texts = found
+    block = spec.body[0]
+    paragraphs = [text for text in texts if _accept(spec, block, text)]
+    if spec.dedup:
+        paragraphs = list(dict.fromkeys(paragraphs))
+    return title, paragraphs
+
+def extract(spec, html: str, whole_page: bool = True):
+    """共用擷取引擎：HTML -> (標題, 導言, 段落)
+
+    whole_page=False：找不到內文容器時不以整頁的 <p> 代替（靜態層的品質檢查用，
+    否則頁尾、側欄的段落也會被算進 min_paragraphs）。
+    """
+    soup = make_soup(html, spec)
+    title = _extract_title(soup, spec.title)
+    lead = spec.lead(soup) if spec.lead else None
+    paragraphs = _extract_paragraphs(spec, soup, whole_page)
+
+    # 選擇器取得的段落不足時，改用頁面內嵌的結構化資料
+    if len(paragraphs) < spec.min_paragraphs:
+        structured_title, structured = _structured_paragraphs(spec, html)
+        if len(structured) > len(paragraphs):
+            paragraphs = structured
+            if title == NO_TITLE and structured_title:
+                title = structured_title
+    return title, lead, paragraphs
+
+def extract_article(site_key: str, html: str, whole_page: bool = True):
+    """以站台 key 擷取（可在子程序執行，只傳遞一般資料）"""
+    return extract(SITES_BY_KEY[site_key], html, whole_page)
+
+@contextmanager
+def _phase(timings: dict, phase: str):
+    """累計各階段耗時（同一階段可能執行兩次，例如靜態 + 渲染後各解析一次）"""
+    started = time.perf_counter()
     try:
-        # 壹蘋網：Playwright（async）
-        if "nextapple.com" in url:
-            async with async_playwright() as p:
-                browser = await p.chromium.launch()
-                page = await browser.new_page()
-                await page.goto(url, timeout=30000, wait_until="domcontentloaded")
-                html = await page.content()
-                await page.close()
-                await browser.close()
-
-            soup = BeautifulSoup(html, "html.parser")
-
-            title_tag = soup.find("h1")
-            title = title_tag.get_text(strip=True) if title_tag else "（未能抓取標題）"
-
-            lead = ""
-            for div in soup.find_all(["div", "h2"]):
-                text = div.get_text(strip=True)
-                if text.startswith("【記者") and "報導" in text:
-                    lead = text
-                    break
-
-            paragraphs = []
-            for p in soup.find_all("p"):
-                text = p.get_text(strip=True)
-                if text:
-                    if text.startswith("【記者") and "報導" in text and paragraphs:
-                        break
-                    paragraphs.append(text)
-
-            return "\n".join([title, lead] + paragraphs)
-
-        # 中天網
-        elif "ctinews.com" in url or "ctitv.com.tw" in url or "cti.com.tw" in url:
-            resp = requests.get(url, timeout=15, verify=False)
-            resp.encoding = "utf-8"
-            soup = BeautifulSoup(resp.text, "html.parser")
-
-            title = soup.find("h1")
-            title_text = title.get_text(strip=True) if title else "（未能抓取標題）"
-
-            exclude_keywords = EXCLUDE_KEYWORDS["ctinews"]
-            paragraphs = []
-            for p in soup.find_all("p"):
-                text = p.get_text(strip=True)
-                if text and len(text) >= 6 and not any(kw in text for kw in exclude_keywords):
-                    paragraphs.append(text)
-
-            return "\n".join([title_text] + paragraphs)
-
-        # 知新聞
-        elif "knews.com.tw" in url:
-            resp = requests.get(url, timeout=15, verify=False)
-            resp.encoding = "utf-8"
-            soup = BeautifulSoup(resp.text, "html.parser")
-
-            title = soup.find("h1") or soup.find("h2")
-            title_text = title.get_text(strip=True) if title else "（未能抓取標題）"
-
-            exclude_keywords = EXCLUDE_KEYWORDS["knews"]
-            paragraphs = []
-            for p in soup.find_all("p"):
-                text = p.get_text(strip=True)
-                if text and len(text) >= 6 and not any(kw in text for kw in exclude_keywords):
-                    paragraphs.append(text)
-
-            return "\n".join([title_text] + paragraphs)
-
-        # 東森新聞
-        elif "ebc.net.tw" in url:
-            resp = requests.get(url, timeout=15, verify=False)
-            resp.encoding = "utf-8"
-            soup = BeautifulSoup(resp.text, "html.parser")
-
-            title = soup.find("h1")
-            title_text = title.get_text(strip=True) if title else "（未能抓取標題）"
-
-            exclude_keywords = EXCLUDE_KEYWORDS["ebc"]
-            paragraphs = []
-            for p in soup.find_all("p"):
-                text = p.get_text(strip=True)
-                if text and len(text) >= 6 and not any(kw in text for kw in exclude_keywords):
-                    paragraphs.append(text)
-
-            return "\n".join([title_text] + paragraphs)
-
-        # 周刊王（必要時用 Playwright async 重抓）
-        elif "ctwant.com" in url:
-            resp = requests.get(url, timeout=15, verify=False)
-            resp.encoding = "utf-8"
-            soup = BeautifulSoup(resp.text, "html.parser")
-
-            title = soup.find("h1") or soup.find("h2")
-            title_text = title.get_text(strip=True) if title else "（未能抓取標題）"
-
-            exclude_keywords = EXCLUDE_KEYWORDS["ctwant"]
-            paragraphs = []
-            content_div = soup.select_one("div.article-content") or soup
-            for p in content_div.find_all("p"):
-                text = p.get_text(strip=True)
-                if text and not any(kw in text for kw in exclude_keywords):
-                    paragraphs.append(text)
-
-            if len(paragraphs) < 3:
-                async with async_playwright() as p:
-                    browser = await p.chromium.launch()
-                    page = await browser.new_page()
-                    await page.goto(url, timeout=30000, wait_until="domcontentloaded")
-                    html = await page.content()
-                    await page.close()
-                    await browser.close()
-
-                soup = BeautifulSoup(html, "html.parser")
-                paragraphs = []
-                content_div = soup.select_one("div.article-content") or soup
-                for p in content_div.find_all("p"):
-                    text = p.get_text(strip=True)
-                    if text and not any(kw in text for kw in exclude_keywords):
-                        paragraphs.append(text)
-
-            return "\n".join([title_text] + paragraphs)
-
-        # 三立新聞網
-        elif "setn.com" in url:
-            resp = requests.get(url, timeout=15, verify=False)
-            resp.encoding = "utf-8"
-            soup = BeautifulSoup(resp.text, "html.parser")
-
-            title = soup.find("h1") or soup.find("h2")
-            title_text = title.get_text(strip=True) if title else "（未能抓取標題）"
-
-            exclude_keywords = EXCLUDE_KEYWORDS["setn"]
-            paragraphs = []
-            content_div = soup.select_one("div.NewsContent") or soup.select_one("div.Content") or soup
-            for p in content_div.find_all("p"):
-                text = p.get_text(strip=True)
-                if text and len(text) >= 6 and not any(kw in text for kw in exclude_keywords):
-                    paragraphs.append(text)
-
-            return "\n".join([title_text] + paragraphs)
-
-        # ETtoday新聞雲
-        elif "ettoday.net" in url:
-            resp = requests.get(url, timeout=15, verify=False)
-            resp.encoding = "utf-8"
-            soup = BeautifulSoup(resp.text, "html.parser")
-
-            title = soup.find("h1") or soup.find("h2")
-            title_text = title.get_text(strip=True) if title else "（未能抓取標題）"
-
-            exclude_keywords = EXCLUDE_KEYWORDS["ettoday"]
-            paragraphs = []
-            content_div = soup.select_one("div.story") or soup
-            for p in content_div.find_all("p"):
-                text = p.get_text(strip=True)
-                if text and len(text) >= 6 and not any(kw in text for kw in exclude_keywords):
-                    paragraphs.append(text)
-
-            return "\n".join([title_text] + paragraphs)
-
-        # UDN 聯合新聞網：Playwright（async）
-        elif "udn.com" in url:
-            async with async_playwright() as p:
-                browser = await p.chromium.launch()
-                page = await browser.new_page()
-                await page.goto(url, timeout=30000, wait_until="domcontentloaded")
-                html = await page.content()
-                await page.close()
-                await browser.close()
-
-            soup = BeautifulSoup(html, "html.parser")
-
-            title = soup.find("h1") or soup.find("h2")
-            if title:
-                title_text = title.get_text(strip=True)
-            else:
-                og_title = soup.select_one('meta[property="og:title"]')
-                title_text = og_title["content"].strip() if og_title and og_title.get("content") else "（未能抓取標題）"
-
-            content_divs = soup.select("div.story-content, section.article-content__editor, div.article-content")
-            if not content_divs:
-                return title_text
-
-            paragraphs = []
-            for div in content_divs:
-                for p in div.find_all("p", recursive=True):
-                    if p.find_parent("figure") or p.find_parent("figcaption"):
-                        continue
-                    text = p.get_text(strip=True)
-                    if text:
-                        paragraphs.append(text)
-
-            seen, clean_paragraphs = set(), []
-            for para in paragraphs:
-                if para not in seen:
-                    clean_paragraphs.append(para)
-                    seen.add(para)
-
-            return "\n".join([title_text] + clean_paragraphs)
-
-        # 中時新聞網：Playwright（async，自訂 context/headers）
-        elif "chinatimes.com" in url:
-            async with async_playwright() as p:
-                browser = await p.chromium.launch()
-                context = await browser.new_context(
-                    viewport={"width": 1920, "height": 1080},
-                    device_scale_factor=1,
-                    is_mobile=False,
-                    has_touch=False,
-                    java_script_enabled=True
-                )
-                page = await context.new_page()
-                await page.set_extra_http_headers({
-                    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                                  "AppleWebKit/537.36 (KHTML, like Gecko) "
-                                  "Chrome/120.0.6099.71 Safari/537.36 Edg/120.0.6099.71",
-                    "Accept-Language": "zh-TW,zh;q=0.9,en;q=0.8",
-                    "Referer": "https://www.google.com/"
-                })
-                await page.goto(url, timeout=60000, wait_until="domcontentloaded")
-                await page.wait_for_selector("div.article-body, div.article-content", timeout=10000)
-                html = await page.content()
-                await page.close()
-                await context.close()
-                await browser.close()
-
-            soup = BeautifulSoup(html, "html.parser")
-            title_text = "（未能抓取標題）"
-            og_title = soup.select_one('meta[property="og:title"]')
-            if og_title and og_title.get("content"):
-                title_text = og_title["content"].strip()
-            else:
-                meta_title = soup.select_one('meta[name="title"]')
-                if meta_title and meta_title.get("content"):
-                    title_text = meta_title["content"].strip()
-
-            exclude_keywords = EXCLUDE_KEYWORDS["chinatimes"]
-            paragraphs = []
-            content_div = soup.select_one("div.article-body") or soup.select_one("div.article-content") or soup
-            for p in content_div.find_all("p"):
-                text = p.get_text(strip=True)
-                if text and len(text) >= 6 and not any(kw in text for kw in exclude_keywords):
-                    paragraphs.append(text)
-
-            return "\n".join([title_text] + paragraphs)
-
-        # 鏡報 Mirror Daily
-        elif "mirrordaily.news" in url:
-            resp = requests.get(url, headers={
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                              "AppleWebKit/537.36 (KHTML, like Gecko) "
-                              "Chrome/120.0.0.0 Safari/537.36",
-                "Accept-Language": "zh-TW,zh;q=0.9,en-US;q=0.8,en;q=0.7",
-                "Referer": "https://www.google.com/",
-            }, timeout=15, verify=False)
-            resp.encoding = "utf-8"
-            soup = BeautifulSoup(resp.text, "html.parser")
-
-            title = soup.find("h1") or soup.find("title")
-            title_text = title.get_text(strip=True) if title else "（未能抓取標題）"
-
-            exclude_keywords = EXCLUDE_KEYWORDS.get("mirrordaily", [])
-            paragraphs = []
-
-            brief = soup.find("article", class_="brief story-renderer")
-            if brief:
-                for t in brief.stripped_strings:
-                    if t.strip():
-                        paragraphs.append(t.strip())
-
-            article_body = soup.find(attrs={"itemprop": "articleBody"}) or soup.find("div", class_="articleBody")
-            if article_body:
-                for t in article_body.stripped_strings:
-                    if t.strip():
-                        paragraphs.append(t.strip())
-
-            seen, clean_paragraphs = set(), []
-            for para in paragraphs:
-                if para not in seen:
-                    clean_paragraphs.append(para)
-                    seen.add(para)
-
-            return "\n".join([title_text] + clean_paragraphs)
-
-        # TVBS新聞網
-        elif "tvbs.com.tw" in url:
-            resp = requests.get(url, timeout=15, verify=False)
-            resp.encoding = "utf-8"
-            soup = BeautifulSoup(resp.text, "html.parser")
-
-            title = soup.select_one("h1.title") or soup.select_one("h1.news-title")
-            title_text = title.get_text(strip=True) if title else "（未能抓取標題）"
-
-            exclude_keywords = EXCLUDE_KEYWORDS.get("tvbs", [])
-            paragraphs = []
-            content_div = soup.select_one("div#news_detail_div")
-            if content_div:
-                for p in content_div.find_all("p"):
-                    text = p.get_text(strip=True)
-                    if text and len(text) > 6 and not any(kw in text for kw in exclude_keywords):
-                        paragraphs.append(text)
-                for node in content_div.stripped_strings:
-                    text = node.strip()
-                    if text and len(text) > 6 and not any(kw in text for kw in exclude_keywords):
-                        if text not in paragraphs:
-                            paragraphs.append(text)
-
-            extra_divs = soup.select("div.article_content, div[align=center]")
-            for div in extra_divs:
-                for p in div.find_all("p"):
-                    text = p.get_text(strip=True)
-                    if text and len(text) > 6 and not any(kw in text for kw in exclude_keywords):
-                        if text not in paragraphs:
-                            paragraphs.append(text)
-
-            return "\n".join([title_text] + paragraphs)
-
-        # 鏡週刊 Mirror Media
-        elif "mirrormedia.mg" in url:
-            resp = requests.get(url, headers={
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                              "AppleWebKit/537.36 (KHTML, like Gecko) "
-                              "Chrome/120.0.0.0 Safari/537.36",
-                "Accept-Language": "zh-TW,zh;q=0.9,en-US;q=0.8,en;q=0.7",
-                "Referer": "https://www.google.com/",
-            }, timeout=15, verify=False)
-            resp.encoding = "utf-8"
-            soup = BeautifulSoup(resp.text, "html.parser")
-
-            title = soup.select_one("h1.story__title")
-            if title:
-                title_text = title.get_text(strip=True)
-            else:
-                og_title = soup.select_one('meta[property="og:title"]')
-                title_text = og_title["content"].strip() if og_title and og_title.get("content") else "（未能抓取標題）"
-
-            exclude_keywords = EXCLUDE_KEYWORDS.get("mirrormedia", [])
-            paragraphs = []
-
-            brief_div = soup.select_one("div.brief__BriefContainer-sc-e5902095-0, div.brief__BriefContainer")
-            if brief_div:
-                for node in brief_div.stripped_strings:
-                    text = node.strip()
-                    if text and len(text) > 6 and not any(kw in text for kw in exclude_keywords):
-                        paragraphs.append(text)
-
-            content_sections = soup.select("section.article-content__Wrapper-sc-f590bf19-0, section.article-content__Wrapper")
-            for sec in content_sections:
-                for node in sec.stripped_strings:
-                    text = node.strip()
-                    if text and len(text) > 6 and not any(kw in text for kw in exclude_keywords):
-                        paragraphs.append(text)
-
-            seen, clean_paragraphs = set(), []
-            for para in paragraphs:
-                if para not in seen:
-                    clean_paragraphs.append(para)
-                    seen.add(para)
-
-            return "\n".join([title_text] + clean_paragraphs)
-
-        # 鏡新聞 mnews.tw
-        elif "mnews.tw" in url:
-            resp = requests.get(url, headers={
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                              "AppleWebKit/537.36 (KHTML, like Gecko) "
-                              "Chrome/120.0.0.0 Safari/537.36",
-                "Accept-Language": "zh-TW,zh;q=0.9,en-US;q=0.8,en;q=0.7",
-                "Referer": "https://www.google.com/",
-            }, timeout=15, verify=False)
-            resp.encoding = "utf-8"
-            soup = BeautifulSoup(resp.text, "html.parser")
-
-            title = soup.select_one("h1")
-            title_text = title.get_text(strip=True) if title else "（未能抓取標題）"
-
-            paragraphs = []
-            brief_div = soup.select_one("div.article-brief_briefWrapper__Gm_Bu")
-            if brief_div:
-                for node in brief_div.stripped_strings:
-                    text = node.strip()
-                    if text and len(text) > 6:
-                        paragraphs.append(text)
-
-            content_articles = soup.select("section.story_contentWrapper__dvkWW > article")
-            for article in content_articles:
-                for p in article.find_all("p"):
-                    if p.find("a"):
-                        continue
-                    text = p.get_text(strip=True)
-                    if text and len(text) >= 6 and not DATE_RE.search(text):
-                        paragraphs.append(text)
-
-            seen, clean_paragraphs = set(), []
-            for para in paragraphs:
-                if para not in seen:
-                    clean_paragraphs.append(para)
-                    seen.add(para)
-
-            return "\n".join([title_text] + clean_paragraphs)
-
-        # 自由時報 LTN
-        elif "ltn.com.tw" in url:
-            resp = requests.get(url, headers={
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                              "AppleWebKit/537.36 (KHTML, like Gecko) "
-                              "Chrome/120.0.0.0 Safari/537.36",
-                "Accept-Language": "zh-TW,zh;q=0.9,en-US;q=0.8,en;q=0.7",
-                "Referer": "https://www.google.com/",
-            }, timeout=15, verify=False)
-            resp.encoding = "utf-8"
-            soup = BeautifulSoup(resp.text, "html.parser")
-
-            title = soup.select_one("h1")
-            title_text = title.get_text(strip=True) if title else "（未能抓取標題）"
-
-            paragraphs = []
-            content_ps = soup.select("div.text p")
-            for p in content_ps:
-                if p.find("a"):
-                    continue
-                text = p.get_text(strip=True)
-                if not text or len(text) < 6:
-                    continue
-                if DATE_RE.search(text):
-                    continue
-                if "攝" in text or "提供" in text:
-                    continue
-                paragraphs.append(text)
-
-            seen, clean_paragraphs = set(), []
-            for para in paragraphs:
-                if para not in seen:
-                    clean_paragraphs.append(para)
-                    seen.add(para)
-
-            return "\n".join([title_text] + clean_paragraphs)
-
-        # 中央社 CNA
-        elif "cna.com.tw" in url:
-            resp = requests.get(url, headers={
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                              "AppleWebKit/537.36 (KHTML, like Gecko) "
-                              "Chrome/120.0.0.0 Safari/537.36",
-                "Accept-Language": "zh-TW,zh;q=0.9,en-US;q=0.8,en;q=0.7",
-                "Referer": "https://www.google.com/",
-            }, timeout=15, verify=False)
-            resp.encoding = "utf-8"
-            soup = BeautifulSoup(resp.text, "html.parser")
-
-            title = soup.select_one("h1")
-            title_text = title.get_text(strip=True) if title else "（未能抓取標題）"
-
-            paragraphs = []
-            content_ps = soup.select("div.paragraph p, div.article p")
-            for p in content_ps:
-                if p.find("a"):
-                    continue
-                text = p.get_text(strip=True)
-                if not text or len(text) < 6:
-                    continue
-                if DATE_RE.search(text) or re.search(r"\(\d{2}/\d{2}\s+\d{2}:\d{2}\s+更新\)", text):
-                    continue
-                if text.startswith("（中央社記者"):
-                    paragraphs.append(text)
-                    continue
-                if CAPTION_RE.search(text) or ("翻攝照片" in text):
-                    continue
-                if "不得轉載" in text or "版權" in text:
-                    continue
-                paragraphs.append(text)
-
-            seen, clean_paragraphs = set(), []
-            for para in paragraphs:
-                if para not in seen:
-                    clean_paragraphs.append(para)
-                    seen.add(para)
-
-            return "\n".join([title_text] + clean_paragraphs)
-
-        else:
-            return "（目前尚未支援此來源）"
-
-    except requests.RequestException as e:
-        return f"（網路錯誤: {e}）"
+        yield
+    finally:
+        timings[phase] = timings.get(phase, 0.0) + time.perf_counter() - started
+
+async def _fetch_static(url: str, spec, timings: dict):
+    """第一層：純 HTTP 抓取（條件式 GET）後擷取；browser 站台的 HTTP 失敗視為品質不足，交由瀏覽器處理
+
+    回傳 ((標題, 導言, 段落), 存放的頁面, 是否取得 HTML)；頁面未變更時第二項為 RawPage，否則為 None。
+    """
+    headers = spec.headers
+    if spec.fetch == "browser":
+        headers = headers or BROWSER_HEADERS
+    try:
+        with _phase(timings, "network"):
+            html, stored = await fetch_revalidated(url, canonical_url(url), headers=headers)
+    except FetchError:
+        if spec.fetch != "browser":
+            raise
+        return (NO_TITLE, None, []), None, False
+    # 之後還有瀏覽器層的站台：只有真正命中內文容器才算通過，整頁退回交給渲染後再做
+    whole_page = spec.fetch != "browser"
+    with _phase(timings, "parse"):
+        return await run_cpu(extract_article, spec.key, html, whole_page), stored, True
+
+async def _render_revalidated(url: str, spec, stored, fetched: bool) -> str:
+    """頁面未變更且存有同版本的渲染結果時直接沿用，否則渲染並存回
+
+    靜態 HTML 沒抓到時不存回：存放區裡的可能是舊版本，渲染結果不能掛在舊的驗證標頭上。
+    """
+    if stored is not None and stored.rendered is not None:
+        return stored.rendered
+    html = await render_site(url, spec)
+    if RAW_STORE is not None and fetched:
+        await RAW_STORE.put_rendered(canonical_url(url), html)
+    return html
+
+async def _fetch_uncached(url: str, spec, timings: dict) -> ArticleResult:
+    if spec.fetch == "browser" and not (spec.static_first and STATIC_FIRST):
+        with _phase(timings, "render"):
+            html = await render_site(url, spec)
+        with _phase(timings, "parse"):
+            title, lead, paragraphs = await run_cpu(extract_article, spec.key, html)
+        tier = "browser"
+    else:
+        (title, lead, paragraphs), stored, fetched = await _fetch_static(url, spec, timings)
+        tier = "static"
+
+        # 靜態頁面段落太少（內容由 JS 產生）時改用瀏覽器重抓內文
+        if len(paragraphs) < spec.min_paragraphs:
+            with _phase(timings, "render"):
+                html = await _render_revalidated(url, spec, stored, fetched)
+            with _phase(timings, "parse"):
+                rendered_title, lead, paragraphs = await run_cpu(extract_article, spec.key, html)
+            if spec.fetch == "browser":
+                title = rendered_title  # 原本就以渲染結果為準的站台
+            tier = "browser"
+
+    return ArticleResult(
+        url=url, source=spec.source, title=title, lead=lead,
+        paragraphs=tuple(paragraphs), tier=tier, timings=timings,
+    )
+
+# 進行中的抓取（同一網址只抓一次，其餘呼叫者共用結果）
+_INFLIGHT: dict[str, asyncio.Task] = {}
+
+def _host(url: str) -> str:
+    return (urlparse(url).hostname or "").lower()
+
+def _record(site: str, result: ArticleResult):
+    """依結果欄位更新指標"""
+    FETCH_TOTAL.inc(site, result.error_kind or result.status)
+    if result.tier:
+        FETCH_TIER.inc(site, result.tier)
+    for phase, seconds in result.timings.items():
+        FETCH_PHASE_SECONDS.observe(seconds, site, phase)
+
+async def _fetch_and_cache(url: str, key: str) -> ArticleResult:
+    spec = find_site(url)
+    if spec is None:
+        result = ArticleResult(url=url, source=_host(url), status="unsupported")
+        CONTENT_CACHE.set(key, result)
+        _record("unsupported", result)
+        return result
+
+    timings = {}
+    started = time.perf_counter()
+    try:
+        result = await _fetch_uncached(url, spec, timings)
+    except (FetchError, httpx.HTTPError) as e:
+        result = ArticleResult(
+            url=url, source=spec.source, status="network_error", error=str(e),
+            error_kind=e.kind if isinstance(e, FetchError) else None, timings=timings,
+        )
     except Exception as e:
-        return f"（抓取失敗: {e}）"
+        result = ArticleResult(url=url, source=spec.source, status="error", error=str(e), timings=timings)
+    FETCH_SECONDS.observe(time.perf_counter() - started, spec.key)
+
+    if result.ok:
+        CONTENT_CACHE.set(key, result)
+    else:
+        CONTENT_CACHE.set_failed(key, result)
+    _record(spec.key, result)
+    return result
+
+async def fetch_content(url: str) -> ArticleResult:
+    """抓取單則新聞，回傳 ArticleResult（失敗時 status 不是 "ok"，不會拋出例外）"""
+    # ✅ 先查快取（以正規化網址為 key）
+    key = canonical_url(url)
+    cached = CONTENT_CACHE.get(key)
+    if cached is not None:
+        spec = find_site(url)
+        FETCH_TOTAL.inc(spec.key if spec is not None else "unsupported", "cache_hit")
+        return cached
+
+    # ✅ 已有相同網址在抓取中就直接等待，不重複發出請求
+    task = _INFLIGHT.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_fetch_and_cache(url, key))
+        _INFLIGHT[key] = task
+        task.add_done_callback(lambda _: _INFLIGHT.pop(key, None))
+    # shield：單一呼叫者被取消時不影響其他等待者
+    return await asyncio.shield(task)
 
 # ✅ 提供別名，讓 Bot 可以用 fetch_news_content
 fetch_news_content = fetch_content
@@ -0,0 +1,119 @@
+# modules/http_client.py
+import asyncio
+import os
+from urllib.parse import urlparse
+
+import httpx
+
+from modules.raw_store import RAW_STORE, RAW_STORE_LOOKUPS
+from modules.resilience import call_with_resilience
+
+# 連線池設定（可用環境變數調整）
+MAX_CONNECTIONS = int(os.environ.get("HTTP_MAX_CONNECTIONS", 32))
+MAX_KEEPALIVE = int(os.environ.get("HTTP_MAX_KEEPALIVE", 16))
+PER_HOST_LIMIT = int(os.environ.get("HTTP_PER_HOST_LIMIT", 4))
+DEFAULT_TIMEOUT = 15
+# 自適應逾時的範圍（秒）：依各網域實際延遲調整，但不超過原本的 15 秒
+MIN_TIMEOUT = float(os.environ.get("HTTP_MIN_TIMEOUT", 5))
+
+# 模擬一般瀏覽器的標頭（部分網站會擋預設 UA）
+BROWSER_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+                  "AppleWebKit/537.36 (KHTML, like Gecko) "
+                  "Chrome/120.0.0.0 Safari/537.36",
+    "Accept-Language": "zh-TW,zh;q=0.9,en-US;q=0.8,en;q=0.7",
+    "Referer": "https://www.google.com/",
+}
+
+_client: httpx.AsyncClient | None = None
+_host_slots: dict[str, asyncio.Semaphore] = {}
+
+
+def get_client() -> httpx.AsyncClient:
+    """取得整個程序共用的 keep-alive 連線池"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            verify=False,  # 與原本 requests(verify=False) 行為一致
+            follow_redirects=True,
+            timeout=DEFAULT_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_KEEPALIVE,
+            ),
+        )
+    return _client
+
+
+def _host_slot(url: str) -> asyncio.Semaphore:
+    """每個網域各自的同時連線上限"""
+    host = (urlparse(url).hostname or "").lower()
+    slot = _host_slots.get(host)
+    if slot is None:
+        slot = _host_slots[host] = asyncio.Semaphore(PER_HOST_LIMIT)
+    return slot
+
+
+async def _get(url: str, headers: dict | None, timeout: float) -> httpx.Response:
+    """逾時依網域延遲自動調整（上限為 timeout），暫時性錯誤會重試；失敗時拋出 FetchError"""
+    async def attempt(attempt_timeout):
+        async with _host_slot(url):
+            resp = await get_client().get(url, headers=headers, timeout=attempt_timeout)
+        if resp.status_code != 304:
+            resp.raise_for_status()
+        return resp
+
+    return await call_with_resilience(
+        url, "http", attempt, default=timeout, floor=min(MIN_TIMEOUT, timeout), ceiling=timeout,
+    )
+
+
+def _decode(resp: httpx.Response) -> str:
+    # 各站皆強制 UTF-8（等同原本 resp.encoding = "utf-8"）
+    return resp.content.decode("utf-8", errors="replace")
+
+
+async def fetch_html(url: str, headers: dict | None = None, timeout: float = DEFAULT_TIMEOUT) -> str:
+    """非阻塞 GET，回傳以 UTF-8 解碼的 HTML
+
+    逾時依網域延遲自動調整（上限為 timeout），暫時性錯誤會重試；失敗時拋出 FetchError。
+    """
+    return _decode(await _get(url, headers, timeout))
+
+
+async def fetch_revalidated(url: str, key: str, headers: dict | None = None, timeout: float = DEFAULT_TIMEOUT):
+    """與 fetch_html 相同，但先查原始 HTML 存放區並送出條件式 GET
+
+    回傳 (html, 存放的頁面)：伺服器回 304 時 html 取自存放區，並附上存放的 RawPage
+    （可能含同版本的渲染結果）；內容有變更或沒有存檔時第二項為 None。
+    """
+    if RAW_STORE is None:
+        return await fetch_html(url, headers=headers, timeout=timeout), None
+
+    stored = await RAW_STORE.get(key)
+    request_headers = dict(headers or {})
+    if stored is not None:
+        request_headers.update(stored.conditional_headers())
+
+    resp = await _get(url, request_headers or None, timeout)
+    if resp.status_code == 304 and stored is not None:
+        RAW_STORE_LOOKUPS.inc("not_modified")
+        return stored.html, stored
+
+    RAW_STORE_LOOKUPS.inc("miss" if stored is None else "modified")
+    html = _decode(resp)
+    etag, last_modified = resp.headers.get("ETag"), resp.headers.get("Last-Modified")
+    if etag or last_modified:  # 沒有驗證標頭就無法判斷是否變更，不必存放
+        await RAW_STORE.put(key, html, etag, last_modified)
+    return html, None
+
+
+async def close_client():
+    """關閉共用連線池（Application 關閉時呼叫）"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+    _host_slots.clear()
+    if RAW_STORE is not None:
+        await RAW_STORE.close()
@@ -0,0 +1,35 @@
+# modules/keyword_filter.py
+import re
+
+
+class KeywordFilter:
+    """把多個關鍵字與正則編譯成單一 regex，每段文字只掃描一次"""
+    __slots__ = ("keywords", "patterns", "_regex")
+
+    def __init__(self, keywords=(), patterns=()):
+        self.keywords = tuple(keywords)
+        self.patterns = tuple(patterns)
+
+        # 長的關鍵字優先，避免被較短的前綴搶先命中
+        parts = [re.escape(kw) for kw in sorted(set(self.keywords), key=len, reverse=True)]
+        parts += [f"(?:{pattern.pattern})" for pattern in self.patterns]
+        self._regex = re.compile("|".join(parts)) if parts else None
+
+    def search(self, text: str) -> bool:
+        """文字含任一關鍵字或符合任一正則即回傳 True"""
+        return self._regex is not None and self._regex.search(text) is not None
+
+    __contains__ = search
+
+    def __or__(self, other):
+        return KeywordFilter(self.keywords + other.keywords, self.patterns + other.patterns)
+
+    def __bool__(self):
+        return self._regex is not None
+
+    def __repr__(self):
+        return f"KeywordFilter(keywords={len(self.keywords)}, patterns={len(self.patterns)})"
+
+
+# 不過濾任何文字
+NO_FILTER = KeywordFilter()
@@ -0,0 +1,128 @@
+# modules/parsing.py
+import os
+import re
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+# ✅ 優先使用 C 實作的 lxml，未安裝時退回內建 html.parser
+try:
+    import lxml  # noqa: F401
+    PARSER = os.environ.get("HTML_PARSER", "lxml")
+except ImportError:
+    PARSER = "html.parser"
+
+# 標題一定要保留的標籤
+_TITLE_TAGS = ("h1", "h2", "title", "meta")
+
+# CSS selector 最左邊的複合選擇器，例如 div.article-content、section.x > article 的 section.x
+_COMPOUND_RE = re.compile(r"^\s*([a-zA-Z][\w-]*|\*)?((?:[.#][\w-]+|\[[^\]]+\])*)")
+_PART_RE = re.compile(r"[.#][\w-]+|\[[^\]]+\]")
+_ATTR_RE = re.compile(r"""^\[\s*([\w-]+)\s*(?:=\s*["']?([^"'\]]*)["']?\s*)?\]$""")
+
+
+class _Compound:
+    """單一複合選擇器（tag + class + id + 屬性），用於解析階段判斷"""
+    __slots__ = ("tag", "classes", "attrs")
+
+    def __init__(self, tag, classes, attrs):
+        self.tag = tag
+        self.classes = classes
+        self.attrs = attrs
+
+    def matches(self, name, attrs) -> bool:
+        if self.tag and self.tag != name:
+            return False
+        if self.classes:
+            classes = attrs.get("class") or ()
+            if isinstance(classes, str):
+                classes = classes.split()
+            if not self.classes.issubset(classes):
+                return False
+        for attr, value in self.attrs:
+            actual = attrs.get(attr)
+            if actual is None or (value is not None and actual != value):
+                return False
+        return True
+
+
+def _parse_compound(selector: str) -> _Compound | None:
+    match = _COMPOUND_RE.match(selector)
+    if not match or not (match.group(1) or match.group(2)):
+        return None
+    tag = match.group(1) if match.group(1) != "*" else None
+    classes, attrs = set(), []
+    for part in _PART_RE.findall(match.group(2) or ""):
+        if part[0] == ".":
+            classes.add(part[1:])
+        elif part[0] == "#":
+            attrs.append(("id", part[1:]))
+        else:
+            attr = _ATTR_RE.match(part)
+            if not attr:
+                return None
+            attrs.append((attr.group(1), attr.group(2)))
+    return _Compound(tag, frozenset(classes), tuple(attrs))
+
+
+class _SubtreeStrainer(SoupStrainer):
+    """只保留符合任一複合選擇器的元素（連同整個子樹）"""
+
+    def __init__(self, compounds):
+        super().__init__()
+        self._compounds = compounds
+
+    def _allowed(self, name, attrs) -> bool:
+        attrs = attrs or {}
+        return any(compound.matches(name, attrs) for compound in self._compounds)
+
+    # beautifulsoup4 >= 4.13
+    def allow_tag_creation(self, nsprefix, name, attrs):
+        return self._allowed(name, attrs)
+
+    # beautifulsoup4 4.12
+    def search_tag(self, markup_name=None, markup_attrs={}):
+        if hasattr(markup_name, "name"):
+            markup_name, markup_attrs = markup_name.name, markup_name.attrs
+        return self._allowed(markup_name, markup_attrs)
+
+
+def build_strainer(spec) -> SoupStrainer | None:
+    """依站台設定只保留標題/meta 與內文容器；無法安全裁剪時回傳 None（解析整頁）"""
+    if spec.lead is not None:
+        return None  # 導言需掃描整頁
+
+    selectors = list(spec.title)
+    for block in spec.body:
+        for selector in block.selectors:
+            if selector is None:
+                if block.mode != "p" or block.skip_figure:
+                    return None
+                selectors.append("p")
+            else:
+                selectors.extend(selector.split(","))
+
+    compounds = [_Compound(tag, frozenset(), ()) for tag in _TITLE_TAGS]
+    for selector in selectors:
+        compound = _parse_compound(selector)
+        if compound is None:
+            return None
+        compounds.append(compound)
+    return _SubtreeStrainer(compounds)
+
+
+_STRAINERS = {}
+
+
+def make_soup(html: str, spec=None) -> BeautifulSoup:
+    """建立 BeautifulSoup；有站台設定時只解析需要的子樹"""
+    if spec is None:
+        return BeautifulSoup(html, PARSER)
+
+    if spec.key not in _STRAINERS:
+        _STRAINERS[spec.key] = build_strainer(spec)
+    strainer = _STRAINERS[spec.key]
+    try:
+        return BeautifulSoup(html, PARSER, parse_only=strainer)
+    except Exception:
+        # 解析器不支援時退回內建 html.parser 整頁解析
+        return BeautifulSoup(html, "html.parser")
@@ -0,0 +1,194 @@
+# modules/raw_store.py
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+
+from modules.metrics import Counter
+
+logger = logging.getLogger("news-export-bot")
+
+# ✅ 預設停用：Cloud Run 的檔案系統在記憶體中，存放區會佔用與程式相同的記憶體上限。
+# 有實體磁碟（或掛載的本機 volume）時設定 RAW_STORE_PATH 啟用，並依可用空間調整上限。
+# 同一台主機上的多個程序可共用同一個檔案；WAL 不支援 NFS 等網路檔案系統。
+RAW_STORE_PATH = os.environ.get("RAW_STORE_PATH", "").strip()
+RAW_STORE_MAX_BYTES = int(os.environ.get("RAW_STORE_MAX_BYTES", 32 * 1024 * 1024))
+# 超過上限時刪到上限的這個比例，避免每次寫入都要清理
+EVICT_TARGET = 0.9
+
+RAW_STORE_LOOKUPS = Counter(
+    "newsbot_raw_store_lookups_total", "原始 HTML 存放區查詢結果（miss / not_modified / modified）", ("outcome",),
+)
+RAW_STORE_EVICTED = Counter("newsbot_raw_store_evicted_total", "因容量上限刪除的頁面數")
+
+
+@dataclass(frozen=True, slots=True)
+class RawPage:
+    """存放的原始回應：靜態 HTML、驗證標頭，以及同一版本的渲染結果（若有）"""
+    html: str
+    etag: str | None = None
+    last_modified: str | None = None
+    rendered: str | None = None
+
+    def conditional_headers(self) -> dict:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+def _pack(text: str | None):
+    return None if text is None else zlib.compress(text.encode("utf-8"), 6)
+
+
+def _unpack(blob) -> str | None:
+    return None if blob is None else zlib.decompress(blob).decode("utf-8")
+
+
+class RawStore:
+    """以正規化網址為 key 的 SQLite 存放區（WAL、zlib 壓縮），依最近使用時間淘汰
+
+    每個程序各自連線；WAL 與 busy timeout 讓同一台主機上的多個程序可同時讀寫。
+    總大小由 trigger 維護在 usage 表（與寫入同一交易），淘汰判斷不必掃描整個表。
+    讀取不寫入資料庫：最近使用時間先記在記憶體，下一次寫入時一併更新。
+    """
+
+    def __init__(self, path: str, max_bytes: int = RAW_STORE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._conn = None
+        self._lock = threading.Lock()
+        self._touched = {}  # key -> 尚未寫回的最近使用時間
+
+    def _connection(self):
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS pages ("
+                " key TEXT PRIMARY KEY,"
+                " html BLOB NOT NULL,"
+                " rendered BLOB,"
+                " etag TEXT,"
+                " last_modified TEXT,"
+                " size INTEGER NOT NULL,"
+                " accessed_at REAL NOT NULL)"
+            )
+            conn.executescript(
+                "BEGIN IMMEDIATE;"
+                "CREATE INDEX IF NOT EXISTS pages_accessed ON pages (accessed_at);"
+                "CREATE TABLE IF NOT EXISTS usage (id INTEGER PRIMARY KEY CHECK (id = 0), total INTEGER NOT NULL);"
+                "INSERT OR IGNORE INTO usage VALUES (0, (SELECT COALESCE(SUM(size), 0) FROM pages));"
+                "CREATE TRIGGER IF NOT EXISTS pages_insert AFTER INSERT ON pages"
+                " BEGIN UPDATE usage SET total = total + NEW.size WHERE id = 0; END;"
+                "CREATE TRIGGER IF NOT EXISTS pages_update AFTER UPDATE OF size ON pages"
+                " BEGIN UPDATE usage SET total = total + NEW.size - OLD.size WHERE id = 0; END;"
+                "CREATE TRIGGER IF NOT EXISTS pages_delete AFTER DELETE ON pages"
+                " BEGIN UPDATE usage SET total = total - OLD.size WHERE id = 0; END;"
+                "COMMIT;"
+            )
+            self._conn = conn
+        return self._conn
+
+    def _get(self, key):
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT html, rendered, etag, last_modified FROM pages WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                self._touched[key] = time.time()
+        if row is None:
+            return None
+        html, rendered, etag, last_modified = row
+        return RawPage(_unpack(html), etag, last_modified, _unpack(rendered))
+
+    def _put(self, key, html, etag, last_modified):
+        blob = _pack(html)
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                # 新版本的靜態 HTML：舊的渲染結果一併作廢
+                conn.execute(
+                    "INSERT INTO pages (key, html, rendered, etag, last_modified, size, accessed_at)"
+                    " VALUES (?, ?, NULL, ?, ?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET html = excluded.html, rendered = NULL,"
+                    " etag = excluded.etag, last_modified = excluded.last_modified,"
+                    " size = excluded.size, accessed_at = excluded.accessed_at",
+                    (key, blob, etag, last_modified, len(blob), time.time()),
+                )
+                self._flush_touched(conn)
+                self._evict(conn)
+
+    def _put_rendered(self, key, rendered):
+        blob = _pack(rendered)
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                # 只附加在已存放的版本上（需有驗證標頭才能判斷是否仍有效）
+                conn.execute(
+                    "UPDATE pages SET rendered = ?, size = length(html) + ?, accessed_at = ? WHERE key = ?",
+                    (blob, len(blob), time.time(), key),
+                )
+                self._flush_touched(conn)
+                self._evict(conn)
+
+    def _flush_touched(self, conn):
+        if self._touched:
+            conn.executemany(
+                "UPDATE pages SET accessed_at = MAX(accessed_at, ?) WHERE key = ?",
+                [(accessed_at, key) for key, accessed_at in self._touched.items()],
+            )
+            self._touched.clear()
+
+    def _evict(self, conn):
+        total = conn.execute("SELECT total FROM usage WHERE id = 0").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # 由最近使用的往回累計，超過目標大小的部分全部刪除
+        deleted = conn.execute(
+            "DELETE FROM pages WHERE key IN ("
+            " SELECT key FROM (SELECT key, SUM(size) OVER (ORDER BY accessed_at DESC, key) AS running FROM pages)"
+            " WHERE running > ?)",
+            (int(self.max_bytes * EVICT_TARGET),),
+        ).rowcount
+        RAW_STORE_EVICTED.inc(amount=deleted)
+
+    def _close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    # 存放區只是加速用：資料庫忙碌或損壞時照常抓取，不讓錯誤影響匯出
+    async def get(self, key: str) -> RawPage | None:
+        try:
+            return await asyncio.to_thread(self._get, key)
+        except (sqlite3.Error, zlib.error) as e:
+            logger.warning(f"讀取原始 HTML 存放區失敗：{e}")
+            return None
+
+    async def put(self, key: str, html: str, etag: str | None, last_modified: str | None):
+        try:
+            await asyncio.to_thread(self._put, key, html, etag, last_modified)
+        except sqlite3.Error as e:
+            logger.warning(f"寫入原始 HTML 存放區失敗：{e}")
+
+    async def put_rendered(self, key: str, rendered: str):
+        try:
+            await asyncio.to_thread(self._put_rendered, key, rendered)
+        except sqlite3.Error as e:
+            logger.warning(f"寫入原始 HTML 存放區失敗：{e}")
+
+    async def close(self):
+        await asyncio.to_thread(self._close)
+
+
+RAW_STORE = RawStore(RAW_STORE_PATH) if RAW_STORE_PATH else None
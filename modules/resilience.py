@@ -0,0 +1,236 @@
+# modules/resilience.py
+import asyncio
+import logging
+import os
+import random
+import sys
+import time
+from urllib.parse import urlparse
+
+import httpx
+
+from modules.metrics import Counter
+
+logger = logging.getLogger("news-export-bot")
+
+# 重試：暫時性錯誤最多再試幾次；退避時間採 full jitter
+FETCH_RETRIES = int(os.environ.get("FETCH_RETRIES", 2))
+RETRY_BASE_DELAY = float(os.environ.get("FETCH_RETRY_BASE_DELAY", 0.5))
+RETRY_MAX_DELAY = float(os.environ.get("FETCH_RETRY_MAX_DELAY", 4))
+
+# 斷路器：同一網域連續幾次呼叫失敗（重試用盡才算一次）後暫停多久（秒）
+BREAKER_FAILURES = int(os.environ.get("BREAKER_FAILURES", 5))
+BREAKER_COOLDOWN = float(os.environ.get("BREAKER_COOLDOWN", 30))
+
+FETCH_RETRIES_TOTAL = Counter("newsbot_fetch_retries_total", "暫時性錯誤的重試次數", ("channel", "kind"))
+BREAKER_OPENED = Counter("newsbot_circuit_opened_total", "斷路器開啟次數", ("domain",))
+
+_KIND_TEXT = {
+    "timeout": "連線逾時",
+    "connect": "無法連線",
+    "http_status": "伺服器回應錯誤",
+    "browser": "瀏覽器載入失敗",
+    "circuit_open": "此網站近期連續失敗，暫停連線",
+    "no_content": "頁面已載入但找不到內文",
+}
+
+
+class FetchError(Exception):
+    """結構化的抓取失敗：種類、網域、HTTP 狀態、嘗試次數"""
+
+    def __init__(self, kind: str, url: str, detail: str = "", status: int | None = None,
+                 attempts: int = 1, transient: bool = False):
+        self.kind = kind
+        self.url = url
+        self.domain = domain_of(url)
+        self.detail = detail
+        self.status = status
+        self.attempts = attempts
+        self.transient = transient
+        super().__init__(str(self))
+
+    def __str__(self):
+        text = _KIND_TEXT.get(self.kind, self.kind)
+        if self.status is not None:
+            text += f" HTTP {self.status}"
+        if self.attempts > 1 and self.kind != "circuit_open":
+            text += f"，已重試 {self.attempts - 1} 次"
+        return f"{text}（{self.domain}）"
+
+
+def domain_of(url: str) -> str:
+    return (urlparse(url).hostname or "").lower()
+
+
+def _playwright_errors():
+    """(TimeoutError, Error)；尚未載入 playwright 時不可能出現它的例外，不必為此載入"""
+    module = sys.modules.get("playwright.async_api")
+    return (module.TimeoutError, module.Error) if module is not None else ((), ())
+
+
+def classify(exc: BaseException):
+    """回傳 (種類, 是否為暫時性錯誤, HTTP 狀態)；無法歸類（程式錯誤等）回傳 None"""
+    if isinstance(exc, FetchError):
+        return exc.kind, exc.transient, exc.status
+    if isinstance(exc, httpx.HTTPStatusError):
+        status = exc.response.status_code
+        return "http_status", status >= 500 or status == 429, status
+    playwright_timeout, playwright_error = _playwright_errors()
+    if isinstance(exc, (httpx.TimeoutException, playwright_timeout)):
+        return "timeout", True, None
+    if isinstance(exc, httpx.TransportError):
+        return "connect", True, None
+    if isinstance(exc, playwright_error):
+        return "browser", True, None
+    return None
+
+
+class LatencyStats:
+    """RFC 6298 式的平滑延遲與變異量（EWMA）"""
+    __slots__ = ("srtt", "rttvar")
+
+    def __init__(self, sample: float):
+        self.srtt = sample
+        self.rttvar = sample / 2
+
+    def add(self, sample: float):
+        self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - sample)
+        self.srtt = 0.875 * self.srtt + 0.125 * sample
+
+    def timeout(self) -> float:
+        return self.srtt + 4 * self.rttvar
+
+
+class CircuitBreaker:
+    """closed → 連續失敗達門檻 → open（直接失敗）→ 冷卻後 half-open（放行一次試探）"""
+    __slots__ = ("failures", "state", "opened_at", "probing")
+
+    def __init__(self):
+        self.failures = 0
+        self.state = "closed"
+        self.opened_at = 0.0
+        self.probing = False
+
+    def allow(self, now: float) -> bool:
+        if self.state == "closed":
+            return True
+        if self.state == "open" and now - self.opened_at >= BREAKER_COOLDOWN:
+            self.state = "half_open"
+            self.probing = False
+        if self.state == "half_open" and not self.probing:
+            self.probing = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.state = "closed"
+        self.probing = False
+
+    def record_failure(self, now: float) -> bool:
+        """回傳這次失敗是否讓斷路器開啟"""
+        self.failures += 1
+        self.probing = False
+        if self.state == "half_open" or (self.state == "closed" and self.failures >= BREAKER_FAILURES):
+            self.state = "open"
+            self.opened_at = now
+            return True
+        return False
+
+
+class DomainHealth:
+    """各網域的延遲統計（依 http / browser 分開）與斷路器"""
+
+    def __init__(self):
+        self._latency = {}   # (網域, 管道) -> LatencyStats
+        self._breakers = {}  # 網域 -> CircuitBreaker
+
+    def timeout(self, domain: str, channel: str, default: float, floor: float, ceiling: float) -> float:
+        """依過去延遲調整逾時；尚無紀錄時用預設值，並限制在 [floor, ceiling]"""
+        stats = self._latency.get((domain, channel))
+        value = default if stats is None else stats.timeout()
+        return min(max(value, floor), ceiling)
+
+    def breaker(self, domain: str) -> CircuitBreaker:
+        breaker = self._breakers.get(domain)
+        if breaker is None:
+            breaker = self._breakers[domain] = CircuitBreaker()
+        return breaker
+
+    def record_latency(self, domain: str, channel: str, seconds: float):
+        stats = self._latency.get((domain, channel))
+        if stats is None:
+            self._latency[(domain, channel)] = LatencyStats(seconds)
+        else:
+            stats.add(seconds)
+
+    def reset(self):
+        self._latency.clear()
+        self._breakers.clear()
+
+
+DOMAIN_HEALTH = DomainHealth()
+
+
+def _backoff(attempt: int) -> float:
+    """full jitter：0 ~ min(上限, 基準 × 2^(n-1)) 之間隨機"""
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** (attempt - 1)))
+
+
+async def call_with_resilience(url: str, channel: str, attempt, *, default: float, floor: float, ceiling: float):
+    """以自適應逾時執行 attempt(timeout 秒)，暫時性錯誤會重試，網域連續失敗時直接回報
+
+    失敗一律轉成 FetchError；無法歸類的例外（例如程式錯誤）原樣拋出。
+    斷路器以「一次呼叫」計算失敗：重試用盡才記一次，half-open 試探失敗則不再重試。
+    整次呼叫（含重試與退避）不超過 ceiling 秒：網域無回應時的代價與原本單次逾時相同，
+    剩餘時間不足 floor 時不再重試；連線中斷、5xx 等很快失敗的錯誤仍可在期限內重試。
+    """
+    domain = domain_of(url)
+    breaker = DOMAIN_HEALTH.breaker(domain)
+    deadline = time.monotonic() + ceiling
+
+    min_timeout = floor
+    for attempt_no in range(1, FETCH_RETRIES + 2):
+        if not breaker.allow(time.monotonic()):
+            raise FetchError("circuit_open", url, attempts=attempt_no, transient=True)
+
+        timeout = min(
+            DOMAIN_HEALTH.timeout(domain, channel, default, min_timeout, ceiling),
+            deadline - time.monotonic(),
+        )
+        start = time.monotonic()
+        try:
+            result = await attempt(timeout)
+        except asyncio.CancelledError:
+            breaker.probing = False
+            raise
+        except Exception as e:
+            classified = classify(e)
+            if classified is None:
+                breaker.probing = False
+                raise
+            kind, transient, status = classified
+            if not transient:
+                # 對方有回應（例如 404），網域本身是健康的
+                breaker.record_success()
+                raise FetchError(kind, url, str(e), status=status, attempts=attempt_no) from e
+
+            if kind == "timeout":
+                # 逾時代表實際延遲至少這麼久：計入統計，下一次嘗試的逾時加倍
+                DOMAIN_HEALTH.record_latency(domain, channel, timeout)
+                min_timeout = min(timeout * 2, ceiling)
+            delay = _backoff(attempt_no)
+            out_of_time = deadline - time.monotonic() - delay < floor
+            if attempt_no > FETCH_RETRIES or breaker.state == "half_open" or out_of_time:
+                if breaker.record_failure(time.monotonic()):
+                    BREAKER_OPENED.inc(domain)
+                    logger.warning(f"{domain} 連續失敗 {breaker.failures} 次，暫停連線 {BREAKER_COOLDOWN:g} 秒。")
+                raise FetchError(kind, url, str(e), status=status, attempts=attempt_no, transient=True) from e
+
+            FETCH_RETRIES_TOTAL.inc(channel, kind)
+            await asyncio.sleep(delay)
+            continue
+
+        DOMAIN_HEALTH.record_latency(domain, channel, time.monotonic() - start)
+        breaker.record_success()
+        return result
@@ -0,0 +1,63 @@
+# modules/resource_policy.py
+import os
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+
+from modules.metrics import Counter
+
+# BROWSER_BLOCK_RESOURCES=0 時不攔截任何請求（除錯用）
+BLOCKING_ENABLED = os.environ.get("BROWSER_BLOCK_RESOURCES", "1").strip().lower() not in ("0", "false", "no")
+
+# 只取文字時用不到的資源類型（Playwright 的 request.resource_type）
+TEXT_ONLY_TYPES = frozenset({"image", "media", "font", "stylesheet"})
+
+# 廣告 / 追蹤 / 分析服務（比對網域後綴）
+AD_HOSTS = (
+    "doubleclick.net", "googlesyndication.com", "googletagmanager.com", "googletagservices.com",
+    "google-analytics.com", "adservice.google.com", "googleadservices.com",
+    "facebook.net", "connect.facebook.com", "scorecardresearch.com", "imrworldwide.com",
+    "taboola.com", "outbrain.com", "criteo.com", "criteo.net", "amazon-adsystem.com",
+    "hotjar.com", "clarity.ms", "onead.com.tw", "ad2iction.com", "popin.cc", "chartbeat.com",
+    "cdn.segment.com", "newrelic.com", "nr-data.net", "quantserve.com", "teads.tv",
+)
+
+BLOCKED_REQUESTS = Counter("newsbot_browser_blocked_requests_total", "渲染時攔截的請求數", ("site", "reason"))
+
+
+@dataclass(frozen=True, slots=True)
+class ResourcePolicy:
+    """渲染頁面時要攔截的資源類型與網域"""
+    types: frozenset = TEXT_ONLY_TYPES
+    hosts: tuple = AD_HOSTS
+
+    def __bool__(self):
+        return bool(self.types or self.hosts)
+
+    def block_reason(self, resource_type: str, url: str) -> str | None:
+        if resource_type in self.types:
+            return resource_type
+        host = (urlsplit(url).hostname or "").lower()
+        for blocked in self.hosts:
+            if host == blocked or host.endswith("." + blocked):
+                return "ad_host"
+        return None
+
+    async def install(self, page, site: str = ""):
+        """在分頁上註冊攔截規則（分頁關閉時自動失效，不影響池中其他分頁）"""
+        if not self or not BLOCKING_ENABLED:
+            return
+
+        async def handle(route):
+            request = route.request
+            reason = self.block_reason(request.resource_type, request.url)
+            if reason is None:
+                await route.continue_()
+            else:
+                BLOCKED_REQUESTS.inc(site, reason)
+                await route.abort()
+
+        await page.route("**/*", handle)
+
+
+DEFAULT_POLICY = ResourcePolicy()
+NO_BLOCKING = ResourcePolicy(types=frozenset(), hosts=())
@@ -0,0 +1,155 @@
+# modules/session_store.py
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger("news-export-bot")
+
+
+class SessionBackend:
+    """使用者清單的持久化介面；Redis 等存放區實作這三個方法即可"""
+
+    async def load(self, user_id) -> list | None:
+        raise NotImplementedError
+
+    async def save_many(self, sessions: dict) -> None:
+        """sessions: user_id -> 清單（list of dict）"""
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+
+class MemoryBackend(SessionBackend):
+    """不落地的後端（開發 / 測試用）"""
+
+    def __init__(self):
+        self._data = {}
+
+    async def load(self, user_id):
+        items = self._data.get(user_id)
+        return json.loads(items) if items is not None else None
+
+    async def save_many(self, sessions):
+        for user_id, items in sessions.items():
+            self._data[user_id] = json.dumps(items, ensure_ascii=False)
+
+
+class SQLiteBackend(SessionBackend):
+    """本機 SQLite（WAL 模式），在背景執行緒存取以免阻塞 event loop"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                " user_id INTEGER PRIMARY KEY,"
+                " items TEXT NOT NULL,"
+                " updated_at REAL NOT NULL)"
+            )
+            self._conn = conn
+        return self._conn
+
+    def _load(self, user_id):
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT items FROM sessions WHERE user_id = ?", (user_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _save_many(self, sessions):
+        now = time.time()
+        rows = [(user_id, json.dumps(items, ensure_ascii=False), now) for user_id, items in sessions.items()]
+        with self._lock:
+            conn = self._connection()
+            with conn:  # 一個交易寫入整批
+                conn.executemany(
+                    "INSERT INTO sessions (user_id, items, updated_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT(user_id) DO UPDATE SET items = excluded.items, updated_at = excluded.updated_at",
+                    rows,
+                )
+
+    def _close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    async def load(self, user_id):
+        return await asyncio.to_thread(self._load, user_id)
+
+    async def save_many(self, sessions):
+        await asyncio.to_thread(self._save_many, sessions)
+
+    async def close(self):
+        await asyncio.to_thread(self._close)
+
+
+class SessionStore:
+    """記憶體快取為主（write-through），變更在背景批次寫回後端"""
+
+    def __init__(self, backend: SessionBackend, flush_interval: float = 1.0, factory=list):
+        self.backend = backend
+        self.flush_interval = flush_interval
+        self.factory = factory  # 由存檔的項目建立清單物件（例如附索引的 ClippingList）
+        self._cache = {}      # user_id -> 清單（handler 直接修改這個物件）
+        self._dirty = set()
+        self._flush_task = None
+
+    async def get(self, user_id) -> list:
+        """取得使用者清單；修改後請呼叫 mark_dirty()"""
+        items = self._cache.get(user_id)
+        if items is None:
+            loaded = await self.backend.load(user_id)
+            items = self._cache.setdefault(user_id, self.factory(loaded or []))
+        return items
+
+    def mark_dirty(self, user_id):
+        self._dirty.add(user_id)
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        # 寫入期間新標記的使用者、寫入失敗待重試的，都在下一輪寫回，直到沒有待寫項目
+        while self._dirty:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def flush(self):
+        """把累積的變更一次寫回"""
+        if not self._dirty:
+            return
+        dirty, self._dirty = self._dirty, set()
+        sessions = {user_id: [dict(item) for item in self._cache.get(user_id, [])] for user_id in dirty}
+        try:
+            await self.backend.save_many(sessions)
+        except asyncio.CancelledError:
+            self._dirty |= dirty  # 關閉時由 close() 重新寫入
+            raise
+        except Exception as e:
+            self._dirty |= dirty  # 下次再試
+            logger.error(f"清單寫入失敗：{e}")
+
+    async def close(self):
+        if self._flush_task is not None and not self._flush_task.done():
+            self._flush_task.cancel()
+        await self.flush()
+        await self.backend.close()
+
+
+def create_backend(kind: str, path: str) -> SessionBackend:
+    if kind == "memory":
+        return MemoryBackend()
+    if kind == "sqlite":
+        return SQLiteBackend(path)
+    raise ValueError(f"未知的 SESSION_BACKEND：{kind}")
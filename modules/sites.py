@@ -0,0 +1,242 @@
+# modules/sites.py
+import re
+from dataclasses import dataclass
+from typing import Callable
+from urllib.parse import urlparse
+
+from modules.http_client import BROWSER_HEADERS
+from modules.resource_policy import DEFAULT_POLICY, ResourcePolicy
+from modules.keyword_filter import KeywordFilter, NO_FILTER
+
+# 常用正則集中化
+DATE_RE = re.compile(r"\d{4}[./]\d{2}[./]\d{2}")
+CAPTION_RE = re.compile(r"（[^）]*(?:攝|提供)[^）]*）$")
+UPDATE_RE = re.compile(r"\(\d{2}/\d{2}\s+\d{2}:\d{2}\s+更新\)")
+
+# 各新聞來源的過濾字典
+EXCLUDE_KEYWORDS = {
+    "ctinews": ["標籤","留言","追蹤我們","新聞分類","影音專區","關於我們","客服資訊","聯絡我們","版權","China Times Group"],
+    "knews": ["延伸閱讀","相關新聞","版權","客服","追蹤","推薦新聞","下載","App","◎加入"],
+    "ebc": ["延伸閱讀","相關新聞","版權","更多新聞","App","下載","優惠","折扣","滿額","品牌","活動"],
+    "ctwant": ["延伸閱讀","相關新聞","更多精彩內容","版權","客服","追蹤","下載","App","立即訂閱","精彩影音","圖／","請用微信掃描","掃描 QR Code","更多 CTWANT 報導","安裝我們的 CTWANT APP","下一則新聞","人氣新聞","關鍵熱搜","隱私權政策","©","iPhone立即安裝","Android立即安裝"],
+    "setn": ["保護被害人隱私","拒絕家庭暴力","請撥打110","請撥打113","彰化夫妻","活春宮","更多新聞","延伸閱讀","版權所有","三立新聞網"],
+    "ettoday": ["延伸閱讀","相關新聞","更多新聞","版權所有","ETtoday新聞雲","請用微信掃描","掃描 QR Code","安裝我們的 APP","精彩影音","隱私權政策","©","iPhone立即安裝","Android立即安裝","▲"],
+    "udn": ["延伸閱讀","相關新聞","更多新聞","版權所有","聯合新聞網","隱私權政策","©","App下載","立即訂閱","精彩影音","本報資料照片"],
+    "chinatimes": ["延伸閱讀","相關新聞","更多新聞","版權所有","中時新聞網","隱私權政策","©","App下載","立即訂閱","精彩影音"],
+    "mirrordaily": ["猜你喜歡","其他人都在看","相關新聞","延伸閱讀","推薦","更多","追蹤","分享","版權","隱私權","服務條款","留言","訂閱","App","下載","TOP","返回","社群","熱門","最新"],
+    "tvbs": ["延伸閱讀","相關新聞","更多新聞","版權所有","TVBS新聞網","隱私權政策","©","App下載","立即訂閱","精彩影音","◤","👉","優惠","折扣","滿額","活動","旅遊優惠","加入TVBS新聞LINE","TVBS鐵粉","下載APP","免費拿點數","抽iPhone","eSIM","韓亞航空","訂房最便宜","省錢攻略"],
+    "mirrormedia": ["延伸閱讀","相關新聞","更多新聞","版權所有","鏡週刊","隱私權政策","©","App下載","立即訂閱","精彩影音","留言","熱門新聞","TOP","返回","社群分享","翻攝","照片","圖片","臉書","Instagram"],
+    "mnews": ["延伸閱讀","相關新聞","更多新聞","版權所有","鏡新聞","隱私權政策","©","App下載","立即訂閱","精彩影音","留言","熱門新聞","TOP","返回","社群分享","翻攝","照片","圖片","臉書","Instagram"]
+}
+
+CHINATIMES_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+                  "AppleWebKit/537.36 (KHTML, like Gecko) "
+                  "Chrome/120.0.6099.71 Safari/537.36 Edg/120.0.6099.71",
+    "Accept-Language": "zh-TW,zh;q=0.9,en;q=0.8",
+    "Referer": "https://www.google.com/"
+}
+
+OG_TITLE = 'meta[property="og:title"]'
+
+
+@dataclass(frozen=True, slots=True)
+class Block:
+    """內文區塊：依序嘗試 selectors 找容器（None 代表整頁），再從容器取出段落"""
+    selectors: tuple = (None,)
+    mode: str = "p"             # "p"：容器內的 <p>；"strings"：容器內所有文字節點
+    all_matches: bool = False   # True：selectors[0] 命中的所有容器都要
+    min_len: int = 0
+    filtered: bool = True       # 是否套用站台的排除規則
+    skip_linked: bool = False   # 略過含連結的段落
+    skip_figure: bool = False   # 略過 figure / figcaption 內的段落
+
+
+@dataclass(frozen=True, slots=True)
+class SiteSpec:
+    """單一新聞來源的抓取與擷取設定"""
+    key: str
+    source: str                 # 報別（Word 表格用）
+    hosts: tuple                # 網域後綴
+    fetch: str = "http"         # "http" | "browser"
+    static_first: bool = False  # browser 站台先試 HTTP + 結構化資料，品質不足才渲染
+    headers: dict | None = None
+    timeout: int = 30000        # 瀏覽器渲染逾時（毫秒）
+    wait_for: str | None = None
+    # "commit"：不等整頁載入，wait_for 出現即回傳；此時 wait_for 必須是內文「之後」的元素
+    # （例如文末標記），否則 HTML 仍在傳輸時就會取到截斷的內文
+    wait_until: str = "domcontentloaded"
+    resources: ResourcePolicy = DEFAULT_POLICY  # 渲染時攔截的資源
+    title: tuple = ("h1",)      # 依序嘗試；meta 標籤取 content
+    body: tuple = (Block(),)
+    exclude: KeywordFilter = NO_FILTER  # 段落命中即排除
+    reject: KeywordFilter = NO_FILTER   # 同上，但在 keep_prefixes 之前檢查
+    keep_prefixes: tuple = ()           # 以此開頭的段落略過 exclude
+    dedup: bool = False
+    min_paragraphs: int = 0     # HTTP 抓到的段落少於此數時改用瀏覽器重抓（品質檢查）
+    lead: Callable | None = None   # soup -> 導言
+    stop: Callable | None = None   # 段落符合時停止擷取
+
+
+def _is_nextapple_byline(text):
+    return text.startswith("【記者") and "報導" in text
+
+
+def _nextapple_lead(soup):
+    for div in soup.find_all(["div", "h2"]):
+        text = div.get_text(strip=True)
+        if _is_nextapple_byline(text):
+            return text
+    return ""
+
+
+SITES = (
+    # 壹蘋網：先 HTTP，段落不足時 Playwright
+    SiteSpec(
+        key="nextapple", source="壹蘋網", hosts=("nextapple.com",),
+        fetch="browser", static_first=True, min_paragraphs=3,
+        lead=_nextapple_lead, stop=_is_nextapple_byline,
+    ),
+    # 中天網
+    SiteSpec(
+        key="ctinews", source="中天網", hosts=("ctinews.com", "ctitv.com.tw", "cti.com.tw"),
+        body=(Block(min_len=6),),
+        exclude=KeywordFilter(EXCLUDE_KEYWORDS["ctinews"]),
+    ),
+    # 知新聞
+    SiteSpec(
+        key="knews", source="知新聞", hosts=("knews.com.tw",),
+        title=("h1", "h2"),
+        body=(Block(min_len=6),),
+        exclude=KeywordFilter(EXCLUDE_KEYWORDS["knews"]),
+    ),
+    # 東森新聞
+    SiteSpec(
+        key="ebc", source="東森網", hosts=("ebc.net.tw",),
+        body=(Block(min_len=6),),
+        exclude=KeywordFilter(EXCLUDE_KEYWORDS["ebc"]),
+    ),
+    # 周刊王（段落太少時用 Playwright 重抓）
+    SiteSpec(
+        key="ctwant", source="周刊王", hosts=("ctwant.com",),
+        title=("h1", "h2"),
+        body=(Block(("div.article-content", None)),),
+        exclude=KeywordFilter(EXCLUDE_KEYWORDS["ctwant"]),
+        min_paragraphs=3,
+    ),
+    # 三立新聞網
+    SiteSpec(
+        key="setn", source="三立網", hosts=("setn.com",),
+        title=("h1", "h2"),
+        body=(Block(("div.NewsContent", "div.Content", None), min_len=6),),
+        exclude=KeywordFilter(EXCLUDE_KEYWORDS["setn"]),
+    ),
+    # ETtoday新聞雲
+    SiteSpec(
+        key="ettoday", source="東森雲", hosts=("ettoday.net",),
+        title=("h1", "h2"),
+        body=(Block(("div.story", None), min_len=6),),
+        exclude=KeywordFilter(EXCLUDE_KEYWORDS["ettoday"]),
+    ),
+    # UDN 聯合新聞網：先 HTTP，段落不足時 Playwright
+    SiteSpec(
+        key="udn", source="聯合新聞網", hosts=("udn.com",),
+        fetch="browser", static_first=True, min_paragraphs=3,
+        title=("h1", "h2", OG_TITLE),
+        body=(Block(("div.story-content, section.article-content__editor, div.article-content",),
+                    all_matches=True, skip_figure=True),),
+        dedup=True,
+    ),
+    # 中時新聞網：先 HTTP，段落不足時 Playwright（自訂 headers，等待內文出現）
+    SiteSpec(
+        key="chinatimes", source="中時新聞網", hosts=("chinatimes.com",),
+        fetch="browser", static_first=True, min_paragraphs=3,
+        headers=CHINATIMES_HEADERS, timeout=60000,
+        wait_for="div.article-body, div.article-content",
+        title=(OG_TITLE, 'meta[name="title"]'),
+        body=(Block(("div.article-body", "div.article-content", None), min_len=6),),
+        exclude=KeywordFilter(EXCLUDE_KEYWORDS["chinatimes"]),
+    ),
+    # 鏡報 Mirror Daily
+    SiteSpec(
+        key="mirrordaily", source="鏡報", hosts=("mirrordaily.news",),
+        headers=BROWSER_HEADERS,
+        title=("h1", "title"),
+        body=(
+            Block(("article.brief.story-renderer",), mode="strings"),
+            Block(("[itemprop=articleBody]", "div.articleBody"), mode="strings"),
+        ),
+        dedup=True,
+    ),
+    # TVBS新聞網
+    SiteSpec(
+        key="tvbs", source="TVBS", hosts=("tvbs.com.tw",),
+        title=("h1.title", "h1.news-title"),
+        body=(
+            Block(("div#news_detail_div",), min_len=7),
+            Block(("div#news_detail_div",), mode="strings", min_len=7),
+            Block(("div.article_content, div[align=center]",), all_matches=True, min_len=7),
+        ),
+        exclude=KeywordFilter(EXCLUDE_KEYWORDS["tvbs"]),
+        dedup=True,
+    ),
+    # 鏡週刊 Mirror Media
+    SiteSpec(
+        key="mirrormedia", source="鏡週刊", hosts=("mirrormedia.mg",),
+        headers=BROWSER_HEADERS,
+        title=("h1.story__title", OG_TITLE),
+        body=(
+            Block(("div.brief__BriefContainer-sc-e5902095-0, div.brief__BriefContainer",),
+                  mode="strings", min_len=7),
+            Block(("section.article-content__Wrapper-sc-f590bf19-0, section.article-content__Wrapper",),
+                  all_matches=True, mode="strings", min_len=7),
+        ),
+        exclude=KeywordFilter(EXCLUDE_KEYWORDS["mirrormedia"]),
+        dedup=True,
+    ),
+    # 鏡新聞 mnews.tw
+    SiteSpec(
+        key="mnews", source="鏡新聞", hosts=("mnews.tw",),
+        headers=BROWSER_HEADERS,
+        body=(
+            Block(("div.article-brief_briefWrapper__Gm_Bu",), mode="strings", min_len=7, filtered=False),
+            Block(("section.story_contentWrapper__dvkWW > article",), all_matches=True,
+                  min_len=6, skip_linked=True),
+        ),
+        exclude=KeywordFilter(patterns=(DATE_RE,)),
+        dedup=True,
+    ),
+    # 自由時報 LTN
+    SiteSpec(
+        key="ltn", source="自由時報", hosts=("ltn.com.tw",),
+        headers=BROWSER_HEADERS,
+        body=(Block(("div.text",), all_matches=True, min_len=6, skip_linked=True),),
+        exclude=KeywordFilter(("攝", "提供"), (DATE_RE,)),
+        dedup=True,
+    ),
+    # 中央社 CNA
+    SiteSpec(
+        key="cna", source="中央社", hosts=("cna.com.tw",),
+        headers=BROWSER_HEADERS,
+        body=(Block(("div.paragraph, div.article",), all_matches=True, min_len=6, skip_linked=True),),
+        reject=KeywordFilter(patterns=(DATE_RE, UPDATE_RE)),
+        exclude=KeywordFilter(("翻攝照片", "不得轉載", "版權"), (CAPTION_RE,)),
+        keep_prefixes=("（中央社記者",),
+        dedup=True,
+    ),
+)
+
+# 網域後綴 -> 設定（查詢時由完整網域逐層往上比對）
+SITES_BY_HOST = {host: spec for spec in SITES for host in spec.hosts}
+SITES_BY_KEY = {spec.key: spec for spec in SITES}
+
+
+def find_site(url: str) -> SiteSpec | None:
+    """依網址網域找出對應的站台設定"""
+    host = (urlparse(url).hostname or "").lower()
+    while host:
+        spec = SITES_BY_HOST.get(host)
+        if spec is not None:
+            return spec
+        _, _, host = host.partition(".")
+    return None
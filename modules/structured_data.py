@@ -0,0 +1,100 @@
+# modules/structured_data.py
+import html as html_lib
+import json
+import re
+
+# 直接以正規表示式從原始 HTML 取出 <script> 內容（不必完整解析 DOM）
+_JSON_LD_RE = re.compile(
+    r"<script[^>]+type=[\"']application/ld\+json[\"'][^>]*>(.*?)</script>",
+    re.IGNORECASE | re.DOTALL,
+)
+_NEXT_DATA_RE = re.compile(
+    r"<script[^>]+id=[\"']__NEXT_DATA__[\"'][^>]*>(.*?)</script>",
+    re.IGNORECASE | re.DOTALL,
+)
+_ARTICLE_TYPES = {"NewsArticle", "Article", "ReportageNews", "AnalysisNewsArticle", "BlogPosting"}
+# __NEXT_DATA__ 內可能存放內文的欄位
+_BODY_KEYS = ("articleBody", "content", "body", "contentHtml", "html", "text")
+_TITLE_KEYS = ("headline", "title")
+
+_P_RE = re.compile(r"<p(?:\s[^>]*)?>(.*?)</p>", re.IGNORECASE | re.DOTALL)
+_BR_RE = re.compile(r"<br\s*/?>", re.IGNORECASE)
+_TAG_RE = re.compile(r"<[^>]+>")
+MIN_BODY_CHARS = 80
+
+
+def _load_json(text: str):
+    try:
+        return json.loads(text)
+    except ValueError:
+        return None
+
+
+def _walk(node):
+    """深度優先走訪 JSON（dict / list）"""
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        if isinstance(current, dict):
+            yield current
+            stack.extend(reversed(list(current.values())))
+        elif isinstance(current, list):
+            stack.extend(reversed(current))
+
+
+def _is_article(node: dict) -> bool:
+    types = node.get("@type")
+    types = types if isinstance(types, list) else [types]
+    return any(t in _ARTICLE_TYPES for t in types)
+
+
+def split_paragraphs(body: str) -> list:
+    """內文（純文字或 HTML 片段）切成段落"""
+    if "<p" in body.lower():
+        chunks = _P_RE.findall(body)
+    else:
+        chunks = re.split(r"\n+", _BR_RE.sub("\n", body))
+    paragraphs = []
+    for chunk in chunks:
+        text = html_lib.unescape(_TAG_RE.sub("", chunk)).strip()
+        if text:
+            paragraphs.append(text)
+    return paragraphs
+
+
+def _json_ld_article(html: str):
+    for match in _JSON_LD_RE.finditer(html):
+        data = _load_json(match.group(1))
+        for node in _walk(data):
+            body = node.get("articleBody")
+            if _is_article(node) and isinstance(body, str) and len(body) >= MIN_BODY_CHARS:
+                headline = node.get("headline")
+                return headline if isinstance(headline, str) else None, body
+    return None
+
+
+def _next_data_article(html: str):
+    match = _NEXT_DATA_RE.search(html)
+    if match is None:
+        return None
+    data = _load_json(match.group(1))
+    best = None  # (長度, 標題, 內文)
+    for node in _walk(data):
+        for key in _BODY_KEYS:
+            body = node.get(key)
+            if isinstance(body, str) and len(body) >= MIN_BODY_CHARS and (best is None or len(body) > best[0]):
+                title = next((node[k] for k in _TITLE_KEYS if isinstance(node.get(k), str)), None)
+                best = (len(body), title, body)
+    return best[1:] if best else None
+
+
+def structured_article(html: str):
+    """從 JSON-LD（articleBody）或 __NEXT_DATA__ 取出 (標題或 None, 段落清單)；都沒有時回傳 None"""
+    for finder in (_json_ld_article, _next_data_article):
+        found = finder(html)
+        if found is not None:
+            title, body = found
+            paragraphs = split_paragraphs(body)
+            if paragraphs:
+                return (title.strip() if title else None), paragraphs
+    return None
@@ -0,0 +1,54 @@
+# modules/webhook_server.py
+import json
+import logging
+
+import tornado.web
+from telegram import Update
+
+from modules.metrics import CONTENT_TYPE, Counter, render_metrics
+
+logger = logging.getLogger("news-export-bot")
+
+WEBHOOK_UPDATES = Counter("newsbot_webhook_updates_total", "收到的 Telegram webhook 更新數", ("outcome",))
+
+
+class TelegramWebhookHandler(tornado.web.RequestHandler):
+    """接收 Telegram 推送的更新，交給 Application 的 update_queue（與 run_webhook 相同的流程）"""
+
+    def initialize(self, bot_application):
+        self.bot_application = bot_application
+
+    async def post(self):
+        try:
+            data = json.loads(self.request.body)
+            update = Update.de_json(data, self.bot_application.bot)
+        except Exception as e:
+            WEBHOOK_UPDATES.inc("invalid")
+            logger.warning(f"無法解析 webhook 內容：{e}")
+            raise tornado.web.HTTPError(400)
+
+        await self.bot_application.update_queue.put(update)
+        WEBHOOK_UPDATES.inc("ok")
+
+    def log_exception(self, typ, value, tb):
+        if not isinstance(value, tornado.web.HTTPError):
+            super().log_exception(typ, value, tb)
+
+
+class MetricsHandler(tornado.web.RequestHandler):
+    """Prometheus 格式的指標"""
+
+    def get(self):
+        self.set_header("Content-Type", CONTENT_TYPE)
+        self.write(render_metrics())
+
+
+def build_web_app(bot_application, webhook_path: str) -> tornado.web.Application:
+    """webhook 與 /metrics 共用同一個 port（Cloud Run 只開放一個）"""
+    return tornado.web.Application(
+        [
+            (webhook_path, TelegramWebhookHandler, {"bot_application": bot_application}),
+            ("/metrics", MetricsHandler),
+        ],
+        log_function=lambda handler: None,  # 不逐筆記錄請求
+    )